@@ -0,0 +1,11 @@
+"""
+ASGI-точка входа: uvicorn billboard_project.asgi:application --workers 4
+
+Асинхронные эндпоинты /api/async/... не занимают воркер на время
+ожидания базы; остальные представления Django выполняет в потоках.
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'billboard_project.settings')
+application = get_asgi_application()
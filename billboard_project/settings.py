@@ -23,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'billboards.metrics.PerformanceMiddleware',
+    'billboards.middleware.ApiGZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,14 +54,85 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'billboard_project.wsgi.application'
+ASGI_APPLICATION = 'billboard_project.asgi.application'
+
+# База данных: DB_ENGINE=sqlite (по умолчанию) или postgresql
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='billboards'),
+            'USER': config('DB_USER', default='billboards'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Постоянные соединения: одно соединение на поток, переиспользуется между запросами
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # Пул PgBouncer в режиме transaction не поддерживает серверные курсоры
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0, cast=int),
+            'OPTIONS': {
+                # Ожидание блокировки при записи (секунды), см. также busy_timeout ниже
+                'timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int) / 1000,
+            },
+        }
+    }
 
-DATABASES = {
+# PRAGMA для каждого нового соединения SQLite (billboards.db.configure_sqlite).
+# WAL позволяет читать во время записи, synchronous=NORMAL в WAL безопасен
+# и не делает fsync на каждый коммит.
+SQLITE_PRAGMAS = {
+    'journal_mode': config('SQLITE_JOURNAL_MODE', default='WAL'),
+    'synchronous': config('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'busy_timeout': config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int),
+}
+
+# Кэш (для нескольких процессов нужен общий бэкенд: Redis, Memcached, файлы или БД;
+# check --deploy предупреждает о LocMemCache, billboards.W001)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='billboards'),
     }
 }
 
+# Время хранения закэшированных ответов API (секунды)
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=600, cast=int)
+
+# Прогрев кэша справочников (категории, контрагенты, сотрудники) перед
+# первым запросом воркера; общий кэш можно заполнить командой warm_cache
+REFERENCE_CACHE_WARMUP = config('REFERENCE_CACHE_WARMUP', default=True, cast=bool)
+
+# Метрики производительности (/metrics в формате Prometheus).
+# Гистограммы хранятся в памяти процесса, каждый воркер отдаёт свои.
+# Без METRICS_TOKEN эндпоинт доступен только при DEBUG.
+METRICS_TOKEN = config('METRICS_TOKEN', default=None)
+# Лог медленных запросов с SQL (логгер billboards.slow), 0 — выключен
+SLOW_REQUEST_THRESHOLD_MS = config('SLOW_REQUEST_THRESHOLD_MS', default=0, cast=int)
+SLOW_REQUEST_MAX_QUERIES = config('SLOW_REQUEST_MAX_QUERIES', default=20, cast=int)
+
+# Срок хранения записей об удалении для /api/sync/ (дни). Клиент с токеном
+# старше этого срока получает полный снимок (reset).
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
+# Списки админки для таблиц больше этого числа строк показывают оценку
+# количества из статистики PostgreSQL вместо COUNT(*), 0 — всегда точно
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,7 +166,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Постраничная пагинация; ?cursor= / ?pagination=cursor включает курсорный режим
+    'DEFAULT_PAGINATION_CLASS': 'billboards.pagination.StandardPagination',
     'PAGE_SIZE': 20
 }
 
@@ -106,3 +180,6 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_ALL_ORIGINS = DEBUG
+
+# Поисковый бэкенд билбордов (по умолчанию FTS5 для SQLite, иначе icontains)
+BILLBOARDS_SEARCH_BACKEND = config('BILLBOARDS_SEARCH_BACKEND', default=None)
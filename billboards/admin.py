@@ -1,8 +1,132 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Contractor, Employee, Category, Billboard, BillboardImage
+from .images import variant_urls
+from .models import (
+    Contractor,
+    Employee,
+    Category,
+    Billboard,
+    BillboardImage,
+    BillboardStatusChange,
+    Booking,
+    ImageJob,
+)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Для списка без фильтров в PostgreSQL берёт оценку числа строк из
+    статистики (pg_class.reltuples) вместо COUNT(*) по всей таблице.
+    Отфильтрованные выборки и таблицы меньше ADMIN_ESTIMATED_COUNT_THRESHOLD
+    считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        if threshold and hasattr(queryset, "query") and not queryset.query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [queryset.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                # -1 — таблица ещё не анализировалась
+                if row and row[0] >= threshold:
+                    return row[0]
+        return super().count
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр по внешнему ключу с поиском через autocomplete админки вместо
+    списка всех связанных объектов в боковой панели. Параметр запроса тот же,
+    что у стандартного фильтра (<поле>__id__exact).
+    Модель-цель должна быть зарегистрирована с search_fields.
+    """
+
+    field_name = None
+    template = "admin/billboards/autocomplete_filter.html"
+
+    def __init__(self, request, params, model, model_admin):
+        field = model._meta.get_field(self.field_name)
+        self.parameter_name = f"{self.field_name}__id__exact"
+        self.title = field.verbose_name
+        super().__init__(request, params, model, model_admin)
+        # Виджет загружает только выбранный объект, остальные — через поиск
+        form_field = field.formfield(
+            widget=AutocompleteSelect(
+                field,
+                model_admin.admin_site,
+                attrs={"data-filter-parameter": self.parameter_name},
+            ),
+            required=False,
+        )
+        self.rendered_widget = form_field.widget.render(
+            self.parameter_name, self.value()
+        )
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class EmployeeFilter(AutocompleteFilter):
+    field_name = "employee"
+
+
+class ContractorFilter(AutocompleteFilter):
+    field_name = "contractor"
+
+
+class LargeTableAdminMixin:
+    """
+    Списки больших таблиц: оценка количества строк вместо COUNT(*),
+    без второго COUNT(*) по всей таблице при фильтрации
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, type) and issubclass(
+                list_filter, AutocompleteFilter
+            ):
+                field = self.model._meta.get_field(list_filter.field_name)
+                return media + AutocompleteSelect(field, self.admin_site).media
+        return media
+
+
+def thumbnail_preview(obj, max_height=100):
+    """Превью по уменьшенной копии (thumbnail), загружаемое лениво"""
+    if not obj.image:
+        return "Нет изображения"
+    return format_html(
+        '<img src="{}" loading="lazy" style="max-height: {}px; max-width: 150px;" />',
+        variant_urls(obj)["thumbnail"],
+        max_height,
+    )
 
 
 @admin.register(Employee)
@@ -29,7 +153,7 @@ class EmployeeAdmin(admin.ModelAdmin):
     )
 
     def billboards_count(self, obj):
-        count = obj.billboards.count()
+        count = obj.billboards_count
         if count > 0:
             url = (
                 reverse("admin:billboards_billboard_changelist")
@@ -39,6 +163,10 @@ class EmployeeAdmin(admin.ModelAdmin):
         return "0 билбордов"
 
     billboards_count.short_description = "Количество билбордов"
+    billboards_count.admin_order_field = "num_billboards"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_billboards_count()
 
 
 @admin.register(Category)
@@ -87,6 +215,10 @@ class CategoryAdmin(admin.ModelAdmin):
         return "0 билбордов"
 
     billboards_count.short_description = "Количество билбордов"
+    billboards_count.admin_order_field = "num_billboards"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_billboards_count()
 
 
 @admin.register(Contractor)
@@ -137,27 +269,26 @@ class ContractorAdmin(admin.ModelAdmin):
         return "0 билбордов"
 
     billboards_count.short_description = "Количество билбордов"
+    billboards_count.admin_order_field = "num_billboards"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_billboards_count()
 
 
 class BillboardImageInline(admin.TabularInline):
     model = BillboardImage
     extra = 1
-    fields = ["image", "alt_text", "order", "is_primary", "image_preview"]
-    readonly_fields = ["image_preview"]
+    fields = ["image", "alt_text", "order", "is_primary", "processing_status", "image_preview"]
+    readonly_fields = ["processing_status", "image_preview"]
 
     def image_preview(self, obj):
-        if obj.image:
-            return format_html(
-                '<img src="{}" style="max-height: 100px; max-width: 150px;" />',
-                obj.image.url,
-            )
-        return "Нет изображения"
+        return thumbnail_preview(obj)
 
     image_preview.short_description = "Превью"
 
 
 @admin.register(Billboard)
-class BillboardAdmin(admin.ModelAdmin):
+class BillboardAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         "id",
         "title",
@@ -173,12 +304,14 @@ class BillboardAdmin(admin.ModelAdmin):
     list_filter = [
         "category",
         "status",
-        "employee",
-        "contractor",
+        EmployeeFilter,
+        ContractorFilter,
         "created_at",
         "start_date",
         "end_date",
     ]
+    list_select_related = ["employee", "category", "contractor"]
+    autocomplete_fields = ["category", "contractor", "employee"]
     search_fields = [
         "title",
         "address",
@@ -218,6 +351,8 @@ class BillboardAdmin(admin.ModelAdmin):
     )
 
     def category_badge(self, obj):
+        if obj.category is None:
+            return "—"
         return format_html(
             '<span style="background-color: {}; color: white; padding: 3px 8px; '
             'border-radius: 12px; font-size: 11px; font-weight: bold;">{}</span>',
@@ -226,6 +361,7 @@ class BillboardAdmin(admin.ModelAdmin):
         )
 
     category_badge.short_description = "Категория"
+    category_badge.admin_order_field = "category__name"
 
     def contractor_info(self, obj):
         if obj.contractor:
@@ -256,6 +392,8 @@ class BillboardAdmin(admin.ModelAdmin):
     status_badge.short_description = "Статус"
 
     def days_left(self, obj):
+        if obj.status == "expired":
+            return format_html('<span style="color: red; font-weight: bold;">Истёк</span>')
         delta = obj.days_until_expiry
         days = delta.days if delta else 0
         if days <= 0:
@@ -268,45 +406,83 @@ class BillboardAdmin(admin.ModelAdmin):
             return format_html('<span style="color: green;">{} дней</span>', days)
 
     days_left.short_description = "Осталось дней"
-
-    def get_queryset(self, request):
-        return (
-            super()
-            .get_queryset(request)
-            .select_related("employee", "category", "contractor")
-        )
+    days_left.admin_order_field = "end_date"
 
 
 @admin.register(BillboardImage)
-class BillboardImageAdmin(admin.ModelAdmin):
+class BillboardImageAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = [
         "billboard",
         "image_preview",
         "alt_text",
         "is_primary",
+        "processing_status",
         "order",
         "uploaded_at",
     ]
     list_filter = [
         "is_primary",
+        "processing_status",
         "uploaded_at",
         "billboard__status",
         "billboard__category",
     ]
     search_fields = ["billboard__title", "alt_text"]
-    readonly_fields = ["uploaded_at", "image_preview"]
+    list_select_related = ["billboard__category"]
+    raw_id_fields = ["billboard"]
+    readonly_fields = ["uploaded_at", "processing_status", "image_preview"]
 
     def image_preview(self, obj):
-        if obj.image:
-            return format_html(
-                '<img src="{}" style="max-height: 100px; max-width: 150px;" />',
-                obj.image.url,
-            )
-        return "Нет изображения"
+        return thumbnail_preview(obj)
 
     image_preview.short_description = "Превью"
 
 
+@admin.register(ImageJob)
+class ImageJobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ["id", "image", "status", "attempts", "run_after", "updated_at"]
+    list_filter = ["status"]
+    list_select_related = ["image__billboard"]
+    readonly_fields = ["image", "attempts", "locked_at", "last_error", "created_at", "updated_at"]
+    actions = ["retry_jobs"]
+
+    def retry_jobs(self, request, queryset):
+        # update() не трогает auto_now: updated_at задаём явно, чтобы смена
+        # статуса изображения попала в ленту синхронизации
+        now = timezone.now()
+        jobs = queryset.exclude(status="running")
+        with transaction.atomic():
+            BillboardImage.objects.filter(pk__in=jobs.values("image_id")).update(
+                processing_status="pending", updated_at=now
+            )
+            updated = jobs.update(
+                status="queued", attempts=0, run_after=now, locked_at=None, updated_at=now
+            )
+        self.message_user(request, f"Поставлено в очередь: {updated}")
+
+    retry_jobs.short_description = "Повторить обработку"
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ["billboard", "contractor", "start_date", "end_date", "price", "status"]
+    list_filter = ["status", ContractorFilter, "start_date", "end_date"]
+    search_fields = ["billboard__title", "contractor__name"]
+    list_select_related = ["billboard__category", "contractor"]
+    raw_id_fields = ["billboard"]
+    autocomplete_fields = ["contractor"]
+    date_hierarchy = "start_date"
+
+
+@admin.register(BillboardStatusChange)
+class BillboardStatusChangeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ["billboard", "old_status", "new_status", "source", "changed_at"]
+    list_filter = ["source", "new_status", "changed_at"]
+    search_fields = ["billboard__title"]
+    list_select_related = ["billboard__category"]
+    readonly_fields = ["billboard", "old_status", "new_status", "source", "changed_at"]
+
+
 # Кастомизация админ-панели
 admin.site.site_header = "Билборды Live - Панель управления"
 admin.site.site_title = "Билборды Live"
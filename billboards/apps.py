@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 class BillboardsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'billboards'
     verbose_name = 'Билборды'
+
+    def ready(self):
+        from . import checks, db, reference, signals  # noqa: F401 (checks регистрируются при импорте)
+
+        connection_created.connect(db.configure_sqlite)
+        post_migrate.connect(signals.create_search_index, sender=self)
+        if getattr(settings, 'REFERENCE_CACHE_WARMUP', True):
+            request_started.connect(reference.warm_on_first_request)
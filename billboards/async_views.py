@@ -0,0 +1,201 @@
+"""
+Асинхронные варианты нагруженных эндпоинтов чтения (/api/async/...).
+Под ASGI (billboard_project.asgi) ожидание базы не занимает воркер:
+запросы выполняются через асинхронный ORM Django, а цикл событий
+тем временем обслуживает другие соединения. Ответы совпадают
+с синхронными эндпоинтами DRF (постраничная и курсорная пагинация,
+?fields=, ?expand=).
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotAllowed
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .caching import async_conditional_cache
+from .filters import filter_billboards
+from .geo import bbox_q, parse_bbox
+from .markers import compact_markers
+from .models import (
+    Billboard,
+    BillboardImage,
+    Booking,
+    Category,
+    Contractor,
+    Employee,
+)
+from .pagination import KeysetPagination
+from .search import get_search_backend
+from .serializers import BillboardListSerializer, CategorySerializer, EmployeeSerializer
+from .stats import collect_statistics
+
+BILLBOARD_DEPENDENCIES = (
+    Billboard,
+    Category,
+    Contractor,
+    Employee,
+    BillboardImage,
+    Booking,
+)
+
+
+def require_get(view):
+    """Аналог require_GET для асинхронных представлений (в Django 4.2 он синхронный)"""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def _error(message, status=400):
+    return _json({"error": message}, status=status)
+
+
+def _invalid_page():
+    # Тот же ответ, что NotFound от PageNumberPagination
+    return _json({"detail": str(PageNumberPagination.invalid_page_message)}, status=404)
+
+
+def _keyset_page(drf_request, queryset, serializer_class):
+    paginator = KeysetPagination()
+    rows = paginator.paginate_queryset(queryset, drf_request)
+    serializer = serializer_class(rows, many=True, context={"request": drf_request})
+    return {
+        "next": paginator.get_next_link(),
+        "previous": paginator.get_previous_link(),
+        "results": serializer.data,
+    }
+
+
+async def _paginated(request, queryset, serializer_class):
+    """
+    Страница в формате StandardPagination: count, next, previous, results
+    или, с ?cursor= / ?pagination=cursor, курсорная страница KeysetPagination
+    """
+    drf_request = Request(request)
+    params = drf_request.query_params
+    if "fields" in params or "expand" in params:
+        queryset = serializer_class(context={"request": drf_request}).restrict_queryset(
+            queryset
+        )
+
+    if (
+        KeysetPagination.cursor_query_param in params
+        or params.get("pagination") == "cursor"
+    ):
+        try:
+            return _json(
+                await sync_to_async(_keyset_page)(drf_request, queryset, serializer_class)
+            )
+        except NotFound as exc:
+            return _json({"detail": str(exc.detail)}, status=404)
+
+    page_size = api_settings.PAGE_SIZE
+    page = params.get("page", "1")
+    if not page.isdigit() or int(page) < 1:
+        return _invalid_page()
+    page = int(page)
+
+    count = await queryset.acount()
+    if page > 1 and (page - 1) * page_size >= count:
+        return _invalid_page()
+    offset = (page - 1) * page_size
+    objects = [obj async for obj in queryset[offset : offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = None
+    if offset + page_size < count:
+        next_url = replace_query_param(url, "page", page + 1)
+    previous_url = None
+    if page == 2:
+        previous_url = remove_query_param(url, "page")
+    elif page > 2:
+        previous_url = replace_query_param(url, "page", page - 1)
+
+    serializer = serializer_class(objects, many=True, context={"request": drf_request})
+    # Сериализаторы билбордов читают кэш справочников, который при смене
+    # версии перезагружается из базы синхронным ORM
+    results = await sync_to_async(lambda: serializer.data)()
+    return _json(
+        {
+            "count": count,
+            "next": next_url,
+            "previous": previous_url,
+            "results": results,
+        }
+    )
+
+
+def _billboards(params, ranked=True):
+    # Выполняется через sync_to_async: nearest= выбирает радиус запросом к базе
+    queryset = filter_billboards(Billboard.objects.prefetch_related("images"), params)
+    search = params.get("search")
+    if ranked and search and not params.get("near"):
+        queryset = get_search_backend().rank_queryset(queryset, search)
+    return queryset
+
+
+@require_get
+@async_conditional_cache(*BILLBOARD_DEPENDENCIES)
+async def billboard_list(request):
+    try:
+        queryset = await sync_to_async(_billboards)(request.GET)
+    except ValueError as exc:
+        return _error(str(exc))
+    return await _paginated(request, queryset, BillboardListSerializer)
+
+
+@require_get
+@async_conditional_cache(*BILLBOARD_DEPENDENCIES)
+async def billboard_markers(request):
+    try:
+        queryset = await sync_to_async(_billboards)(request.GET, ranked=False)
+        if request.GET.get("bbox"):
+            queryset = queryset.filter(bbox_q(parse_bbox(request.GET["bbox"])))
+    except ValueError as exc:
+        return _error(str(exc))
+    # Два запроса (маркеры и словарь категорий) одним переходом в поток ORM
+    return _json(await sync_to_async(compact_markers)(queryset))
+
+
+@require_get
+@async_conditional_cache(*BILLBOARD_DEPENDENCIES)
+async def billboard_statistics(request):
+    try:
+        queryset = await sync_to_async(_billboards)(request.GET, ranked=False)
+    except ValueError as exc:
+        return _error(str(exc))
+    return _json(await sync_to_async(collect_statistics)(queryset))
+
+
+@require_get
+@async_conditional_cache(Category, Billboard)
+async def category_list(request):
+    return await _paginated(
+        request,
+        Category.objects.filter(is_active=True).with_billboards_count(),
+        CategorySerializer,
+    )
+
+
+@require_get
+@async_conditional_cache(Employee)
+async def employee_list(request):
+    return await _paginated(
+        request, Employee.objects.filter(is_active=True), EmployeeSerializer
+    )
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import reference
+from .geo import grid_cell
+from .images import IMAGE_VARIANTS, variant_path
+from .models import (
+    Billboard,
+    BillboardImage,
+    Booking,
+    Category,
+    Contractor,
+    Employee,
+)
+from .rollups import rebuild_rollups
+from .search import get_search_backend
+
+# Объёмы данных по умолчанию
+DEFAULT_VOLUMES = {
+    "employees": 20,
+    "categories": 10,
+    "contractors": 200,
+    "billboards": 5000,
+    "images": 2,
+    "bookings": 4,
+}
+
+# Область генерации координат (Ташкент): west, south, east, north
+SEED_BBOX = (69.1, 41.2, 69.4, 41.4)
+
+# Параметры обязательных аргументов действий; несколько вариантов —
+# несколько замеров. {category}, {contractor} и даты периода подставляются
+# из данных в адрес запроса; метка замера содержит шаблон, чтобы не
+# меняться от запуска к запуску.
+ACTION_REQUESTS = {
+    "billboard-viewport": [{"query": "bbox=69.2,41.25,69.3,41.35&zoom=15"}],
+    "billboard-clusters": [
+        {"query": "bbox=69.1,41.2,69.4,41.4&zoom=11"},
+        {"query": "bbox=69.1,41.2,69.4,41.4&zoom=13"},
+    ],
+    "billboard-by-category": [{"query": "category={category}"}],
+    "billboard-by-contractor": [{"query": "contractor={contractor}"}],
+    "billboard-available": [{"query": "start={period_start}&end={period_end}"}],
+    "billboard-export": [
+        {"kwargs": {"export_format": "csv"}},
+        {"kwargs": {"export_format": "ndjson"}},
+        {"kwargs": {"export_format": "geojson"}},
+    ],
+}
+
+# Дополнительные варианты списков (фильтры, поиск, пагинация, sparse fieldsets)
+LIST_REQUESTS = {
+    "analytics-list": [
+        "dimension=category",
+        "period=day&dimension=contractor",
+    ],
+    "billboard-list": [
+        "status=active",
+        "search=Навои",
+        "pagination=cursor",
+        "fields=id,title,status,location",
+        "expand=category_data",
+        "near=41.3,69.25&radius=2",
+        "near=41.3,69.25&nearest=10",
+    ],
+}
+
+
+def seed_data(volumes=None, seed=0):
+    """
+    Заполняет базу тестовыми данными заданного объёма через bulk_create.
+    Возвращает фактические объёмы.
+    """
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    rng = random.Random(seed)
+    today = timezone.localdate()
+
+    employees = Employee.objects.bulk_create(
+        Employee(
+            first_name=f"Сотрудник{i}",
+            last_name=rng.choice(["Иванов", "Петров", "Каримов", "Юсупов"]),
+            email=f"employee{i}@example.com",
+            position="Менеджер",
+        )
+        for i in range(volumes["employees"])
+    )
+    categories = Category.objects.bulk_create(
+        Category(name=f"Категория {i}", slug=f"category-{i}", order=i)
+        for i in range(volumes["categories"])
+    )
+    contractors = Contractor.objects.bulk_create(
+        Contractor(
+            name=f"Контрагент {i}",
+            contact_person=f"Контакт {i}",
+            inn=f"{300000000 + i}",
+        )
+        for i in range(volumes["contractors"])
+    )
+
+    west, south, east, north = SEED_BBOX
+    statuses = [status for status, _ in Billboard.STATUS_CHOICES]
+    streets = ["ул. Навои", "пр. Амира Темура", "ул. Бабура", "ул. Шота Руставели"]
+    billboards = []
+    for i in range(volumes["billboards"]):
+        latitude = Decimal(f"{rng.uniform(south, north):.7f}")
+        longitude = Decimal(f"{rng.uniform(west, east):.7f}")
+        start = today - timedelta(days=rng.randint(0, 365))
+        billboards.append(
+            Billboard(
+                title=f"Билборд {i}",
+                category=rng.choice(categories) if categories else None,
+                contractor=rng.choice(contractors) if contractors else None,
+                employee=rng.choice(employees),
+                width=Decimal(rng.choice(["3.00", "6.00", "12.00"])),
+                height=Decimal(rng.choice(["3.00", "4.00"])),
+                address=f"{rng.choice(streets)}, {rng.randint(1, 200)}",
+                latitude=latitude,
+                longitude=longitude,
+                grid_cell=grid_cell(latitude, longitude),
+                start_date=start,
+                end_date=start + timedelta(days=rng.randint(30, 540)),
+                status=rng.choice(statuses),
+                price=Decimal(rng.randint(10, 500) * 100000),
+            )
+        )
+    billboards = Billboard.objects.bulk_create(billboards, batch_size=1000)
+
+    images = []
+    for billboard in billboards:
+        for order in range(volumes["images"]):
+            name = f"billboards/{billboard.pk}/photo-{order}.jpg"
+            images.append(
+                BillboardImage(
+                    billboard=billboard,
+                    image=name,
+                    order=order,
+                    is_primary=order == 0,
+                    processing_status="ready",
+                    variants={
+                        variant: {
+                            "width": size,
+                            "height": size * 3 // 4,
+                            "webp": variant_path(name, variant, "webp"),
+                            "jpg": variant_path(name, variant, "jpg"),
+                        }
+                        for variant, size in IMAGE_VARIANTS.items()
+                    },
+                )
+            )
+    BillboardImage.objects.bulk_create(images, batch_size=1000)
+
+    bookings = []
+    for billboard in billboards:
+        start = today.replace(day=1)
+        for _ in range(volumes["bookings"]):
+            length = rng.randint(7, 60)
+            bookings.append(
+                Booking(
+                    billboard=billboard,
+                    contractor=rng.choice(contractors) if contractors else None,
+                    start_date=start,
+                    end_date=start + timedelta(days=length - 1),
+                    price=Decimal(rng.randint(10, 500) * 100000),
+                )
+            )
+            start += timedelta(days=length + rng.randint(0, 30))
+    Booking.objects.bulk_create(bookings, batch_size=1000)
+
+    backend = get_search_backend()
+    if hasattr(backend, "ensure_table"):
+        backend.ensure_table()
+    backend.rebuild()
+    rebuild_rollups()
+    return volumes
+
+
+def _format(value, context):
+    return value.format(**context) if value else value
+
+
+def benchmark_requests():
+    """
+    Запросы для замеров: list и detail каждого ViewSet из роутера и все его
+    GET-действия. Новые ViewSet и действия попадают в замеры автоматически.
+    """
+    from .urls import router
+
+    today = timezone.localdate()
+    context = {
+        "category": Category.objects.values_list("slug", flat=True).first(),
+        "contractor": Contractor.objects.values_list("pk", flat=True).first(),
+        "period_start": (today + timedelta(days=180)).isoformat(),
+        "period_end": (today + timedelta(days=194)).isoformat(),
+    }
+
+    requests = []
+    for prefix, viewset, basename in router.registry:
+        list_name = f"{basename}-list"
+        requests.append((list_name, reverse(list_name)))
+        for query in LIST_REQUESTS.get(list_name, []):
+            requests.append((f"{list_name}?{query}", f"{reverse(list_name)}?{query}"))
+
+        queryset = getattr(viewset, "queryset", None)
+        pk = None
+        if queryset is not None:
+            pk = queryset.order_by("pk").values_list("pk", flat=True).first()
+        if pk is not None:
+            requests.append(
+                (f"{basename}-detail", reverse(f"{basename}-detail", args=[pk]))
+            )
+
+        for action in viewset.get_extra_actions():
+            if "get" not in action.mapping or action.detail:
+                continue
+            name = f"{basename}-{action.url_name}"
+            for variant in ACTION_REQUESTS.get(name, [{}]):
+                url = reverse(name, kwargs=variant.get("kwargs"))
+                query = variant.get("query")
+                label = name
+                if variant.get("kwargs"):
+                    label += ":" + ",".join(map(str, variant["kwargs"].values()))
+                if query:
+                    label += f"?{query}"
+                    url += f"?{_format(query, context)}"
+                requests.append((label, url))
+    return requests
+
+
+# Синхронный эндпоинт DRF -> асинхронный вариант для замеров пропускной способности
+ASYNC_ENDPOINTS = {
+    "billboard-list": "async-billboard-list",
+    "billboard-markers": "async-billboard-markers",
+    "billboard-statistics": "async-billboard-statistics",
+    "category-list": "async-category-list",
+    "employee-list": "async-employee-list",
+}
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def measure(client, url, iterations):
+    """
+    Количество SQL-запросов, задержка (p50/p95, мс) и размер ответа.
+    Кэш очищается перед каждым замером, чтобы измерялась полная обработка;
+    справочники прогреваются заново, как у работающего воркера.
+    """
+    timings = []
+    queries = size = status = None
+    for _ in range(iterations):
+        cache.clear()
+        reference.warm()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url, HTTP_ACCEPT="application/json")
+            if response.streaming:
+                content = b"".join(response.streaming_content)
+            else:
+                content = response.content
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+        size = len(content)
+        status = response.status_code
+    return {
+        "status": status,
+        "queries": queries,
+        "p50_ms": round(_percentile(timings, 50), 2),
+        "p95_ms": round(_percentile(timings, 95), 2),
+        "bytes": size,
+    }
+
+
+def run_benchmarks(iterations=20):
+    client = Client(HTTP_HOST="localhost")
+    return {label: measure(client, url, iterations) for label, url in benchmark_requests()}
+
+
+def compare(results, baseline, tolerance=0.5, min_delta_ms=5.0):
+    """
+    Регрессии относительно базовой линии: любое увеличение числа запросов,
+    рост p95 или размера ответа больше чем на tolerance (доля), а также
+    замеры, которых нет в базовой линии (иначе они не проверялись бы вовсе)
+    """
+    regressions = []
+    for label, current in results.items():
+        previous = baseline.get(label)
+        if previous is None:
+            regressions.append(f"{label}: нет в базовой линии (--update-baseline)")
+            continue
+        if current["queries"] > previous["queries"]:
+            regressions.append(
+                f"{label}: запросов {previous['queries']} → {current['queries']}"
+            )
+        if (
+            current["p95_ms"] > previous["p95_ms"] * (1 + tolerance)
+            and current["p95_ms"] - previous["p95_ms"] > min_delta_ms
+        ):
+            regressions.append(
+                f"{label}: p95 {previous['p95_ms']} → {current['p95_ms']} мс"
+            )
+        if current["bytes"] > previous["bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: размер {previous['bytes']} → {current['bytes']} байт"
+            )
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(path, volumes, results):
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(
+            {"volumes": volumes, "results": results},
+            fp,
+            ensure_ascii=False,
+            indent=2,
+            sort_keys=True,
+        )
+        fp.write("\n")
+
+
+def _sync_throughput(url, concurrency, total):
+    """Запросов в секунду: WSGI-обработчик в concurrency потоках"""
+
+    def worker(count):
+        client = Client(HTTP_HOST="localhost")
+        try:
+            for index in range(count):
+                client.get(f"{url}?nocache={index}", HTTP_ACCEPT="application/json")
+        finally:
+            connections.close_all()
+
+    counts = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(worker, counts))
+    return total / (time.perf_counter() - started)
+
+
+def _async_throughput(url, concurrency, total):
+    """Запросов в секунду: ASGI-обработчик, concurrency одновременных запросов"""
+
+    async def run():
+        client = AsyncClient(HTTP_HOST="localhost")
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(index):
+            async with semaphore:
+                await client.get(f"{url}?nocache={index}", HTTP_ACCEPT="application/json")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request(index) for index in range(total)))
+        return total / (time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+def run_throughput(concurrency=16, total=200):
+    """
+    Пропускная способность синхронных эндпоинтов DRF (WSGI, потоки) и их
+    асинхронных вариантов (ASGI) при concurrency одновременных запросах.
+    Параметр nocache делает адрес каждого запроса уникальным, чтобы
+    измерялась обработка, а не выдача из кэша ответов.
+    """
+    results = {}
+    for sync_name, async_name in ASYNC_ENDPOINTS.items():
+        row = {}
+        for mode, name, measure_fn in (
+            ("sync", sync_name, _sync_throughput),
+            ("async", async_name, _async_throughput),
+        ):
+            row[mode] = round(measure_fn(reverse(name), concurrency, total), 1)
+        results[sync_name] = row
+    return results
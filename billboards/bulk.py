@@ -0,0 +1,194 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .geo import grid_cell
+from .importers import build_lookups
+from .models import Billboard, BillboardStatusChange
+from .rollups import SNAPSHOT_FIELDS, snapshot
+from .serializers import BillboardImportSerializer
+from .signals import billboards_bulk_changed
+
+# Максимум объектов в одном пакетном запросе
+BULK_MAX_ITEMS = 5000
+
+STATUSES = {status for status, _ in Billboard.STATUS_CHOICES}
+
+
+class BulkRequestError(ValueError):
+    """Тело пакетного запроса не является списком допустимого размера"""
+
+
+def _check_items(items, name="items"):
+    if not isinstance(items, list):
+        raise BulkRequestError(f"{name} must be a list")
+    if not items:
+        raise BulkRequestError(f"{name} must not be empty")
+    if len(items) > BULK_MAX_ITEMS:
+        raise BulkRequestError(f"{name} must contain at most {BULK_MAX_ITEMS} elements")
+    return items
+
+
+def _serializer(partial=False):
+    # Один сериализатор на весь пакет: поля и справочники строятся один раз
+    return BillboardImportSerializer(
+        context={"lookups": build_lookups()}, partial=partial
+    )
+
+
+def bulk_create_billboards(items):
+    """
+    Создаёт билборды одним bulk_create. Если хотя бы один элемент не прошёл
+    проверку, ничего не сохраняется.
+    Возвращает (результаты [{index, id}], ошибки [{index, errors}]).
+    """
+    _check_items(items)
+    serializer = _serializer()
+    billboards, errors = [], []
+    for index, data in enumerate(items):
+        try:
+            if not isinstance(data, dict):
+                raise ValidationError({"non_field_errors": ["Ожидался объект."]})
+            validated = serializer.run_validation(data)
+        except ValidationError as exc:
+            errors.append({"index": index, "errors": exc.detail})
+            continue
+        billboard = Billboard(**validated)
+        billboard.grid_cell = grid_cell(billboard.latitude, billboard.longitude)
+        billboards.append(billboard)
+    if errors:
+        return [], errors
+
+    with transaction.atomic():
+        Billboard.objects.bulk_create(billboards)
+        billboards_bulk_changed(
+            billboards,
+            rollup_changes=[(None, snapshot(billboard)) for billboard in billboards],
+        )
+    return [
+        {"index": index, "id": billboard.pk} for index, billboard in enumerate(billboards)
+    ], []
+
+
+def bulk_update_billboards(items):
+    """
+    Частичное обновление: каждый элемент содержит id и изменяемые поля.
+    Строки блокируются на время проверки и записи, запись — один bulk_update
+    по объединению изменённых полей. При ошибке ничего не сохраняется.
+    Возвращает (результаты [{index, id}], ошибки [{index, errors}]).
+    """
+    _check_items(items)
+    ids = [data.get("id") if isinstance(data, dict) else None for data in items]
+    serializer = _serializer(partial=True)
+
+    with transaction.atomic():
+        existing = Billboard.objects.select_for_update().in_bulk(
+            {pk for pk in ids if isinstance(pk, int)}
+        )
+        changed, fields, errors = {}, set(), []
+        previous_locations, status_changes, rollup_changes = [], [], []
+        for index, (pk, data) in enumerate(zip(ids, items)):
+            billboard = existing.get(pk)
+            if billboard is None:
+                errors.append({"index": index, "errors": {"id": ["Билборд не найден."]}})
+                continue
+            try:
+                validated = serializer.run_validation(
+                    {key: value for key, value in data.items() if key != "id"}
+                )
+            except ValidationError as exc:
+                errors.append({"index": index, "errors": exc.detail})
+                continue
+
+            location = (billboard.latitude, billboard.longitude)
+            status = billboard.status
+            previous = snapshot(billboard)
+            for name, value in validated.items():
+                setattr(billboard, name, value)
+            rollup_changes.append((previous, snapshot(billboard)))
+            fields.update(validated)
+            if location != (billboard.latitude, billboard.longitude):
+                previous_locations.append(location)
+                billboard.grid_cell = grid_cell(billboard.latitude, billboard.longitude)
+                fields.add("grid_cell")
+            if status != billboard.status:
+                status_changes.append((billboard, status))
+            changed[billboard.pk] = billboard
+        if errors:
+            return [], errors
+
+        # bulk_update не вызывает save(), поэтому auto_now проставляем сами
+        now = timezone.now()
+        for billboard in changed.values():
+            billboard.updated_at = now
+        Billboard.objects.bulk_update(
+            changed.values(), sorted(fields | {"updated_at"}), batch_size=1000
+        )
+        BillboardStatusChange.objects.bulk_create(
+            BillboardStatusChange(
+                billboard=billboard,
+                old_status=old_status,
+                new_status=billboard.status,
+                source="manual",
+                changed_at=now,
+            )
+            for billboard, old_status in status_changes
+        )
+        billboards_bulk_changed(changed.values(), previous_locations, rollup_changes)
+    return [{"index": index, "id": pk} for index, pk in enumerate(ids)], []
+
+
+def bulk_change_status(ids, status):
+    """
+    Переводит билборды ids в статус status одним UPDATE и записывает историю.
+    Возвращает {"changed": [...], "unchanged": [...], "not_found": [...]}.
+    """
+    _check_items(ids, "ids")
+    if not all(isinstance(pk, int) for pk in ids):
+        raise BulkRequestError("ids must be a list of integers")
+    if status not in STATUSES:
+        raise BulkRequestError(
+            f"status must be one of: {', '.join(sorted(STATUSES))}"
+        )
+
+    with transaction.atomic():
+        rows = list(
+            Billboard.objects.select_for_update()
+            .filter(pk__in=set(ids))
+            .order_by()
+            .values_list("id", "latitude", "longitude", *SNAPSHOT_FIELDS)
+        )
+        changed = [row for row in rows if row[3] != status]
+        if changed:
+            now = timezone.now()
+            Billboard.objects.filter(pk__in=[row[0] for row in changed]).update(
+                status=status, updated_at=now
+            )
+            BillboardStatusChange.objects.bulk_create(
+                BillboardStatusChange(
+                    billboard_id=pk,
+                    old_status=old_status,
+                    new_status=status,
+                    source="manual",
+                    changed_at=now,
+                )
+                for pk, _, _, old_status, *_ in changed
+            )
+            billboards_bulk_changed(
+                (
+                    Billboard(pk=pk, latitude=latitude, longitude=longitude)
+                    for pk, latitude, longitude, *_ in changed
+                ),
+                rollup_changes=[
+                    (tuple(previous), (status, *previous[1:]))
+                    for _, _, _, *previous in changed
+                ],
+            )
+
+    found = {row[0] for row in rows}
+    changed_ids = {row[0] for row in changed}
+    return {
+        "changed": sorted(changed_ids),
+        "unchanged": sorted(found - changed_ids),
+        "not_found": sorted(set(ids) - found),
+    }
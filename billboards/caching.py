@@ -0,0 +1,259 @@
+import hashlib
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+
+def _timestamp_field(model):
+    """Поле, по которому определяется время последнего изменения таблицы"""
+    for name in ("updated_at", "uploaded_at", "created_at"):
+        try:
+            return model._meta.get_field(name).column
+        except FieldDoesNotExist:
+            continue
+    return None
+
+
+def _version_key(model):
+    return f"billboards:version:{model._meta.label_lower}"
+
+
+def bump_version(*models):
+    """Отмечает изменение таблиц: сбрасывает ETag и кэш ответов, зависящих от них"""
+    now = time.time()
+    cache.set_many({_version_key(model): now for model in models}, None)
+
+
+def get_versions(*models):
+    """Текущие версии таблиц (None, если версия ещё не выставлялась)"""
+    versions = cache.get_many([_version_key(model) for model in models])
+    return {model: versions.get(_version_key(model)) for model in models}
+
+
+def table_state(models):
+    """
+    Количество строк и время последнего изменения для каждой модели
+    одним запросом (UNION ALL по таблицам)
+    """
+    parts = []
+    for model in models:
+        column = _timestamp_field(model)
+        parts.append(
+            f"SELECT '{model._meta.label_lower}', COUNT(*), MAX({column}) "
+            f"FROM {model._meta.db_table}"
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(parts))
+        rows = cursor.fetchall()
+
+    state = {}
+    for label, count, last_modified in rows:
+        if isinstance(last_modified, str):
+            last_modified = datetime.fromisoformat(last_modified)
+        if last_modified is not None and timezone.is_naive(last_modified):
+            last_modified = last_modified.replace(tzinfo=dt_timezone.utc)
+        state[label] = (count, last_modified)
+    return state
+
+
+def compute_validators(url, media_type, models):
+    """
+    ETag и Last-Modified ответа по адресу запроса и состоянию таблиц models.
+    url — полный адрес со схемой и хостом: тела ответов содержат абсолютные
+    ссылки (next, изображения) и не должны отдаваться под другим хостом
+    """
+    models = list(models)
+    state = table_state(models)
+    versions = cache.get_many([_version_key(model) for model in models])
+
+    last_modified = None
+    parts = [
+        url,
+        media_type,
+        # days_until_expiry и expiring_soon зависят от текущей даты
+        timezone.localdate().isoformat(),
+    ]
+    for model in models:
+        label = model._meta.label_lower
+        count, modified = state[label]
+        version = versions.get(_version_key(model))
+        parts.append(f"{label}:{count}:{modified}:{version}")
+        candidates = [modified]
+        if version is not None:
+            candidates.append(datetime.fromtimestamp(version, tz=dt_timezone.utc))
+        for candidate in candidates:
+            if candidate is not None and (
+                last_modified is None or candidate > last_modified
+            ):
+                last_modified = candidate
+
+    etag = '"%s"' % hashlib.md5("|".join(parts).encode()).hexdigest()
+    return etag, last_modified
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        # Слабое сравнение: GZipMiddleware помечает ETag сжатых ответов как W/
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags or "*" in tags
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return (
+        since is not None
+        and last_modified is not None
+        and int(last_modified.timestamp()) <= since
+    )
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ["Accept"])
+    return response
+
+
+def _response_key(etag):
+    return f"billboards:response:{etag}"
+
+
+def async_conditional_cache(*models):
+    """
+    Условный GET и кэш ответов для асинхронных представлений (JSON):
+    те же ETag, Last-Modified и кэш тел, что у ConditionalCacheMixin
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return await view(request, *args, **kwargs)
+
+            etag, last_modified = await sync_to_async(compute_validators)(
+                request.build_absolute_uri(), "application/json", models
+            )
+            if is_not_modified(request, etag, last_modified):
+                return set_validators(HttpResponseNotModified(), etag, last_modified)
+
+            cached = await cache.aget(_response_key(etag))
+            if cached is not None:
+                content, content_type = cached
+                return set_validators(
+                    HttpResponse(content, content_type=content_type), etag, last_modified
+                )
+
+            response = await view(request, *args, **kwargs)
+            if response.status_code == 200:
+                await cache.aset(
+                    _response_key(etag),
+                    (response.content, response["Content-Type"]),
+                    settings.RESPONSE_CACHE_TIMEOUT,
+                )
+                set_validators(response, etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class NotModifiedOrCached(Exception):
+    """Прерывает обработку запроса готовым ответом (304 или тело из кэша)"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalCacheMixin:
+    """
+    Условный GET и кэширование ответов для чтения.
+    ETag и Last-Modified строятся из количества строк, max(updated_at)
+    и версий зависимых моделей; версии сдвигаются сигналами save/delete.
+    Тело JSON-ответа хранится в кэше Django под ключом ETag.
+    """
+
+    cached_actions = ("list", "retrieve")
+    cached_formats = ("json", "msgpack")
+    cache_dependencies = ()
+
+    def _conditional_enabled(self, request):
+        return (
+            request.method == "GET"
+            and self.action in self.cached_actions
+            and getattr(request, "accepted_renderer", None) is not None
+            and request.accepted_renderer.format in self.cached_formats
+        )
+
+    def _validators(self, request):
+        return compute_validators(
+            request.build_absolute_uri(),
+            request.accepted_media_type,
+            self.cache_dependencies,
+        )
+
+    def _not_modified(self, request, etag, last_modified):
+        return is_not_modified(request, etag, last_modified)
+
+    def _set_validators(self, response, etag, last_modified):
+        return set_validators(response, etag, last_modified)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional = None
+        if not self._conditional_enabled(request):
+            return
+
+        etag, last_modified = self._validators(request)
+        self._conditional = (etag, last_modified)
+        if self._not_modified(request, etag, last_modified):
+            raise NotModifiedOrCached(
+                self._set_validators(HttpResponseNotModified(), etag, last_modified)
+            )
+
+        cached = cache.get(_response_key(etag))
+        if cached is not None:
+            content, content_type = cached
+            raise NotModifiedOrCached(
+                self._set_validators(
+                    HttpResponse(content, content_type=content_type),
+                    etag,
+                    last_modified,
+                )
+            )
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModifiedOrCached):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        conditional = getattr(self, "_conditional", None)
+        if (
+            conditional
+            and isinstance(response, Response)
+            and response.status_code == 200
+        ):
+            etag, last_modified = conditional
+            self._set_validators(response, etag, last_modified)
+
+            def store(rendered):
+                cache.set(
+                    _response_key(etag),
+                    (rendered.content, rendered["Content-Type"]),
+                    settings.RESPONSE_CACHE_TIMEOUT,
+                )
+
+            response.add_post_render_callback(store)
+        return response
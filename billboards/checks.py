@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Бэкенды, кэш которых у каждого процесса свой
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Версии таблиц (ETag, кэш ответов, справочники, тайлы кластеров) хранятся
+    в кэше Django и должны быть общими для всех воркеров
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            f"Кэш {backend} не общий для процессов: при нескольких воркерах "
+            "изменения, сделанные в одном, другие не увидят (справочники, "
+            "ETag и кэш ответов останутся устаревшими).",
+            hint="Задайте CACHE_BACKEND и CACHE_LOCATION общего бэкенда: "
+            "Redis, Memcached, DatabaseCache или FileBasedCache.",
+            id="billboards.W001",
+        )
+    ]
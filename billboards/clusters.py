@@ -0,0 +1,186 @@
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.db.models import Count, FloatField, Min, Q, Sum, Value
+from django.db.models.functions import Cast, Floor
+
+from .caching import bump_version, get_versions
+from .geo import bbox_q, tile_bounds, tile_for, tiles_for_bbox
+from .models import Category
+
+# Кластеры строятся для масштабов 0..MAX_CLUSTER_ZOOM, ближе используется viewport
+MAX_CLUSTER_ZOOM = 16
+# Тайл делится на CLUSTER_GRID x CLUSTER_GRID ячеек, каждая ячейка — один кластер
+CLUSTER_GRID = 8
+# Максимум тайлов в одном запросе (экран 1920x1080 покрывает ~40 тайлов)
+MAX_CLUSTER_TILES = 64
+CLUSTER_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(zoom, x, y):
+    return f"billboards:clusters:{zoom}:{x}:{y}:version"
+
+
+def _data_key(zoom, x, y, version, filters_key):
+    return f"billboards:clusters:{zoom}:{x}:{y}:{version}:{filters_key}"
+
+
+def _categories_version():
+    """
+    Версия таблицы категорий: кластеры содержат slug категорий, поэтому
+    переименование или удаление категории делает устаревшими все тайлы
+    """
+    version = get_versions(Category)[Category]
+    if version is None:
+        # Версия вытеснена из кэша — задаём новую, чтобы не вернуть тайлы,
+        # построенные до изменения категорий
+        bump_version(Category)
+        version = get_versions(Category)[Category]
+    return version
+
+
+def filters_cache_key(params):
+    """Ключ набора фильтров запроса (кроме параметров области карты)"""
+    items = sorted(
+        (key, value)
+        for key, values in params.lists()
+        if key not in ("bbox", "zoom", "format")
+        for value in values
+    )
+    return hashlib.md5(repr(items).encode()).hexdigest()
+
+
+def _tile_queryset(queryset, x, y, zoom):
+    west, south, east, north = tile_bounds(x, y, zoom)
+    condition = bbox_q((west, south, east, north))
+    # Верхние границы не включаем, чтобы точка на стыке попала в один тайл
+    if x < 2 ** zoom - 1:
+        condition &= Q(longitude__lt=east)
+    if y > 0:
+        condition &= Q(latitude__lt=north)
+    return queryset.filter(condition)
+
+
+def compute_tile_clusters(queryset, x, y, zoom):
+    """Кластеры одного тайла: центроид, количество и разбивка по статусам/категориям"""
+    west, south, east, north = tile_bounds(x, y, zoom)
+    step_x = (east - west) / CLUSTER_GRID
+    step_y = (north - south) / CLUSTER_GRID
+
+    rows = (
+        _tile_queryset(queryset, x, y, zoom)
+        .order_by()
+        .prefetch_related(None)
+        .annotate(
+            cell_x=Floor(
+                (Cast("longitude", FloatField()) - Value(west)) / Value(step_x)
+            ),
+            cell_y=Floor(
+                (Cast("latitude", FloatField()) - Value(south)) / Value(step_y)
+            ),
+        )
+        .values("cell_x", "cell_y", "status", "category__slug")
+        .annotate(
+            count=Count("id"),
+            lat_sum=Sum("latitude"),
+            lng_sum=Sum("longitude"),
+            first_id=Min("id"),
+        )
+    )
+
+    cells = {}
+    for row in rows:
+        key = (
+            min(int(row["cell_x"]), CLUSTER_GRID - 1),
+            min(int(row["cell_y"]), CLUSTER_GRID - 1),
+        )
+        cell = cells.setdefault(
+            key,
+            {
+                "count": 0,
+                "lat_sum": 0.0,
+                "lng_sum": 0.0,
+                "first_id": row["first_id"],
+                "statuses": {},
+                "categories": {},
+            },
+        )
+        cell["count"] += row["count"]
+        cell["lat_sum"] += float(row["lat_sum"])
+        cell["lng_sum"] += float(row["lng_sum"])
+        cell["first_id"] = min(cell["first_id"], row["first_id"])
+        cell["statuses"][row["status"]] = (
+            cell["statuses"].get(row["status"], 0) + row["count"]
+        )
+        slug = row["category__slug"]
+        if slug:
+            cell["categories"][slug] = cell["categories"].get(slug, 0) + row["count"]
+
+    clusters = []
+    for cell in cells.values():
+        cluster = {
+            "lat": round(cell["lat_sum"] / cell["count"], 7),
+            "lng": round(cell["lng_sum"] / cell["count"], 7),
+            "count": cell["count"],
+            "statuses": cell["statuses"],
+            "categories": cell["categories"],
+        }
+        if cell["count"] == 1:
+            cluster["billboard_id"] = cell["first_id"]
+        clusters.append(cluster)
+    return clusters
+
+
+def get_clusters(queryset, bbox, zoom, filters_key):
+    """
+    Кластеры для прямоугольника на заданном масштабе.
+    Результат каждого тайла кэшируется отдельно; ключ включает версию тайла,
+    которая сбрасывается при изменении билбордов в этом тайле, и версию
+    таблицы категорий.
+    """
+    tiles = tiles_for_bbox(bbox, zoom, limit=MAX_CLUSTER_TILES)
+
+    version_keys = {tile: _version_key(zoom, *tile) for tile in tiles}
+    versions = cache.get_many(version_keys.values())
+    missing = {
+        key: uuid.uuid4().hex for key in version_keys.values() if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    categories_version = _categories_version()
+    data_keys = {
+        tile: _data_key(
+            zoom, *tile, f"{versions[version_keys[tile]]}.{categories_version}", filters_key
+        )
+        for tile in tiles
+    }
+    cached = cache.get_many(data_keys.values())
+
+    clusters = []
+    fresh = {}
+    for tile in tiles:
+        key = data_keys[tile]
+        if key in cached:
+            tile_clusters = cached[key]
+        else:
+            tile_clusters = compute_tile_clusters(queryset, *tile, zoom)
+            fresh[key] = tile_clusters
+        clusters.extend(tile_clusters)
+    if fresh:
+        cache.set_many(fresh, CLUSTER_CACHE_TIMEOUT)
+    return {"tiles": len(tiles), "cached_tiles": len(cached), "clusters": clusters}
+
+
+def invalidate_locations(locations):
+    """Сбрасывает кэш кластеров всех тайлов, в которые попадают точки"""
+    keys = set()
+    for latitude, longitude in locations:
+        if latitude is None or longitude is None:
+            continue
+        for zoom in range(MAX_CLUSTER_ZOOM + 1):
+            keys.add(_version_key(zoom, *tile_for(latitude, longitude, zoom)))
+    if keys:
+        cache.delete_many(list(keys))
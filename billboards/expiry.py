@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Billboard, BillboardStatusChange
+from .rollups import SNAPSHOT_FIELDS
+from .signals import billboards_bulk_changed
+
+# Статусы, которые переводятся в expired после окончания аренды
+EXPIRING_STATUSES = ("active", "pending")
+
+
+def expired_queryset(today=None):
+    """
+    Билборды с прошедшей датой окончания, ещё не переведённые в expired.
+    Условие status IN (...) AND end_date < today — диапазон индекса (status, end_date).
+    """
+    today = today or timezone.localdate()
+    return Billboard.objects.filter(status__in=EXPIRING_STATUSES, end_date__lt=today)
+
+
+def sweep_expired(today=None, batch_size=500):
+    """
+    Переводит истёкшие билборды в статус expired пачками по batch_size
+    (одна транзакция на пачку) и записывает смены статусов в историю.
+    Возвращает количество обновлённых билбордов.
+    """
+    today = today or timezone.localdate()
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                expired_queryset(today)
+                .select_for_update()
+                .order_by()
+                .values_list("id", "latitude", "longitude", *SNAPSHOT_FIELDS)[
+                    :batch_size
+                ]
+            )
+            if not rows:
+                break
+
+            now = timezone.now()
+            Billboard.objects.filter(pk__in=[row[0] for row in rows]).update(
+                status="expired", updated_at=now
+            )
+            BillboardStatusChange.objects.bulk_create(
+                BillboardStatusChange(
+                    billboard_id=pk,
+                    old_status=status,
+                    new_status="expired",
+                    source="expiry",
+                    changed_at=now,
+                )
+                for pk, _, _, status, *_ in rows
+            )
+            billboards_bulk_changed(
+                (
+                    Billboard(pk=pk, latitude=latitude, longitude=longitude)
+                    for pk, latitude, longitude, *_ in rows
+                ),
+                rollup_changes=[
+                    (tuple(previous), ("expired", *previous[1:]))
+                    for _, _, _, *previous in rows
+                ],
+            )
+        total += len(rows)
+    return total
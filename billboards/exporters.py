@@ -0,0 +1,115 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Формат выгрузки -> Content-Type
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "geojson": "application/geo+json",
+}
+
+# Столбец выгрузки -> поле запроса. Названия столбцов совпадают с форматом
+# импорта, поэтому выгрузку можно загрузить обратно через import_billboards.
+EXPORT_FIELDS = (
+    ("id", "id"),
+    ("title", "title"),
+    ("status", "status"),
+    ("address", "address"),
+    ("latitude", "latitude"),
+    ("longitude", "longitude"),
+    ("width", "width"),
+    ("height", "height"),
+    ("start_date", "start_date"),
+    ("end_date", "end_date"),
+    ("price", "price"),
+    ("category_slug", "category__slug"),
+    ("contractor_inn", "contractor__inn"),
+    ("contractor_name", "contractor__name"),
+    ("employee_email", "employee__email"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+)
+
+# Строк, читаемых из курсора базы за один раз
+CHUNK_SIZE = 2000
+# Строк в одном фрагменте ответа
+BATCH_SIZE = 500
+
+
+def export_rows(queryset):
+    """
+    Строки выгрузки как словари. Читаются через values_list().iterator(),
+    поэтому модели и связанные объекты не создаются, а память не растёт
+    с количеством строк.
+    """
+    names = [name for name, _ in EXPORT_FIELDS]
+    rows = (
+        queryset.prefetch_related(None)
+        .values_list(*(source for _, source in EXPORT_FIELDS))
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for row in rows:
+        yield dict(zip(names, row))
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    # BOM нужен Excel, чтобы распознать UTF-8
+    yield "﻿" + writer.writerow([name for name, _ in EXPORT_FIELDS])
+    for row in rows:
+        yield writer.writerow([_plain(value) for value in row.values()])
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def _geojson_lines(rows):
+    yield '{"type": "FeatureCollection", "features": [\n'
+    separator = ""
+    for row in rows:
+        feature = {
+            "type": "Feature",
+            "id": row["id"],
+            "geometry": {
+                "type": "Point",
+                "coordinates": [float(row["longitude"]), float(row["latitude"])],
+            },
+            "properties": row,
+        }
+        yield separator + json.dumps(feature, cls=DjangoJSONEncoder, ensure_ascii=False)
+        separator = ",\n"
+    yield "\n]}\n"
+
+
+WRITERS = {"csv": _csv_lines, "ndjson": _ndjson_lines, "geojson": _geojson_lines}
+
+
+def stream_export(queryset, fmt):
+    """Фрагменты текста выгрузки; каждый объединяет до BATCH_SIZE строк"""
+    batch = []
+    for line in WRITERS[fmt](export_rows(queryset)):
+        batch.append(line)
+        if len(batch) >= BATCH_SIZE:
+            yield "".join(batch)
+            batch = []
+    if batch:
+        yield "".join(batch)
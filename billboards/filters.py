@@ -0,0 +1,104 @@
+from .geo import bbox_q, distance_km, parse_point, radius_bbox
+from .search import get_search_backend
+
+# Максимальный радиус поиска рядом с точкой (near=lat,lng&radius=), км
+MAX_RADIUS_KM = 500.0
+# Максимум ближайших билбордов (nearest=k)
+MAX_NEAREST = 100
+# Начальный радиус поиска ближайших; удваивается, пока не найдётся k билбордов
+NEAREST_START_RADIUS_KM = 1.0
+
+
+def _within(queryset, point, radius):
+    """Билборды в круге: отбор по индексу прямоугольником, затем точное расстояние"""
+    return (
+        queryset.filter(bbox_q(radius_bbox(*point, radius)))
+        .annotate(distance=distance_km(*point))
+        .filter(distance__lte=radius)
+    )
+
+
+def filter_nearby(queryset, params):
+    """
+    Поиск рядом с точкой: near=lat,lng и radius=км и/или nearest=k.
+    Добавляет к строкам distance (км) и сортирует по нему.
+    Бросает ValueError при неверных параметрах.
+    """
+    point = parse_point(params["near"])
+
+    radius = params.get("radius")
+    nearest = params.get("nearest")
+    if not radius and not nearest:
+        raise ValueError("near requires radius or nearest parameter")
+    if radius:
+        try:
+            radius = float(radius)
+        except ValueError:
+            raise ValueError("radius must be a number of kilometres")
+        if not 0 < radius <= MAX_RADIUS_KM:
+            raise ValueError(f"radius must be between 0 and {MAX_RADIUS_KM:g} km")
+    else:
+        radius = MAX_RADIUS_KM
+
+    if nearest:
+        if not nearest.isdigit() or not 1 <= int(nearest) <= MAX_NEAREST:
+            raise ValueError(f"nearest must be an integer between 1 and {MAX_NEAREST}")
+        nearest = int(nearest)
+        # Радиус расширяется, пока в круге не окажется k билбордов; расстояние
+        # k-го ограничивает выборку, так что к ней можно применять другие фильтры
+        search_radius = min(NEAREST_START_RADIUS_KM, radius)
+        while True:
+            kth = (
+                _within(queryset, point, search_radius)
+                .order_by("distance")
+                .values_list("distance", flat=True)[nearest - 1 : nearest]
+                .first()
+            )
+            if kth is not None:
+                radius = kth
+                break
+            if search_radius >= radius:
+                break
+            search_radius = min(search_radius * 2, radius)
+
+    return _within(queryset, point, radius).order_by("distance", "pk")
+
+
+def filter_billboards(queryset, params):
+    """
+    Фильтры списка билбордов из параметров запроса (category, status,
+    employee, contractor, search, near). Используются API и выгрузками.
+    """
+    # Фильтрация по категории (по slug или id)
+    category = params.get("category", None)
+    if category:
+        if category.isdigit():
+            queryset = queryset.filter(category_id=category)
+        else:
+            queryset = queryset.filter(category__slug=category)
+
+    # Фильтрация по статусу
+    status_filter = params.get("status", None)
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    # Фильтрация по сотруднику
+    employee_id = params.get("employee", None)
+    if employee_id:
+        queryset = queryset.filter(employee_id=employee_id)
+
+    # Фильтрация по контрагенту
+    contractor_id = params.get("contractor", None)
+    if contractor_id:
+        queryset = queryset.filter(contractor_id=contractor_id)
+
+    # Поиск по названию, адресу, сотруднику, категории и контрагенту
+    search = params.get("search", None)
+    if search:
+        queryset = get_search_backend().filter_queryset(queryset, search)
+
+    # Поиск рядом с точкой и сортировка по расстоянию
+    if params.get("near"):
+        queryset = filter_nearby(queryset, params)
+
+    return queryset
@@ -0,0 +1,203 @@
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+
+# Размер ячейки геосетки в градусах (~1.1 км по широте)
+GRID_CELL_SIZE = 0.01
+GRID_ROWS = int(round(180 / GRID_CELL_SIZE))
+GRID_COLS = int(round(360 / GRID_CELL_SIZE))
+
+# Если окно захватывает больше строк сетки, индекс ячеек не даёт выигрыша
+# и фильтрация идёт только по координатам
+GRID_MAX_ROWS = 200
+
+MAX_ZOOM = 22
+
+# Средний радиус Земли и длина градуса меридиана, км
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+def _grid_row(lat):
+    return min(max(int(math.floor((lat + 90) / GRID_CELL_SIZE)), 0), GRID_ROWS - 1)
+
+
+def _grid_col(lng):
+    return min(max(int(math.floor((lng + 180) / GRID_CELL_SIZE)), 0), GRID_COLS - 1)
+
+
+def grid_cell(lat, lng):
+    """Номер ячейки геосетки для точки"""
+    if lat is None or lng is None:
+        return None
+    return _grid_row(float(lat)) * GRID_COLS + _grid_col(float(lng))
+
+
+def parse_bbox(value):
+    """
+    Разбор параметра bbox в формате 'west,south,east,north'.
+    Возвращает кортеж (west, south, east, north) или бросает ValueError.
+    """
+    if not value:
+        raise ValueError("bbox parameter is required")
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("bbox must be 'west,south,east,north'")
+    if not (-90 <= south <= 90 and -90 <= north <= 90):
+        raise ValueError("bbox latitude must be between -90 and 90")
+    if not (-180 <= west <= 180 and -180 <= east <= 180):
+        raise ValueError("bbox longitude must be between -180 and 180")
+    if south > north:
+        raise ValueError("bbox south must not exceed north")
+    return west, south, east, north
+
+
+def parse_zoom(value):
+    """Разбор уровня масштаба карты (0–22). Возвращает None, если не передан"""
+    if value in (None, ""):
+        return None
+    if not value.isdigit() or not 0 <= int(value) <= MAX_ZOOM:
+        raise ValueError(f"zoom must be an integer between 0 and {MAX_ZOOM}")
+    return int(value)
+
+
+def parse_point(value):
+    """Разбор точки 'lat,lng'. Возвращает (lat, lng) или бросает ValueError"""
+    try:
+        lat, lng = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError("near must be 'lat,lng'")
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise ValueError("near must be a valid 'lat,lng' point")
+    return lat, lng
+
+
+def radius_bbox(lat, lng, radius_km):
+    """
+    Прямоугольник (west, south, east, north), содержащий круг радиуса radius_km.
+    У полюсов и для больших радиусов захватывает все долготы.
+    """
+    delta_lat = radius_km / KM_PER_DEGREE
+    south, north = lat - delta_lat, lat + delta_lat
+    if south <= -90 or north >= 90:
+        return -180.0, max(south, -90.0), 180.0, min(north, 90.0)
+    delta_lng = delta_lat / math.cos(math.radians(max(abs(south), abs(north))))
+    if delta_lng >= 180:
+        return -180.0, south, 180.0, north
+    west, east = lng - delta_lng, lng + delta_lng
+    # Переход через антимеридиан: west > east, см. _lng_spans
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return west, south, east, north
+
+
+def distance_km(lat, lng, prefix=""):
+    """Выражение SQL: расстояние по формуле гаверсинусов от точки до билборда, км"""
+    lat1, lng1 = Radians(Value(lat)), Radians(Value(lng))
+    lat2 = Radians(Cast(F(f"{prefix}latitude"), FloatField()))
+    lng2 = Radians(Cast(F(f"{prefix}longitude"), FloatField()))
+    half_chord = Power(Sin((lat2 - lat1) / 2), 2) + Cos(lat1) * Cos(lat2) * Power(
+        Sin((lng2 - lng1) / 2), 2
+    )
+    # Least защищает ASIN от значений чуть больше 1 из-за округления
+    return Value(2 * EARTH_RADIUS_KM) * ASin(
+        Least(Sqrt(half_chord), Value(1.0)), output_field=FloatField()
+    )
+
+
+def _lng_spans(west, east):
+    """Диапазоны долгот с учётом пересечения антимеридиана"""
+    if west <= east:
+        return [(west, east)]
+    return [(west, 180.0), (-180.0, east)]
+
+
+def bbox_q(bbox, prefix=""):
+    """
+    Q-условие попадания билборда в прямоугольник.
+    Для небольших окон добавляет диапазоны по индексированной ячейке сетки,
+    чтобы запрос выполнялся как набор коротких сканирований индекса.
+    """
+    west, south, east, north = bbox
+    spans = _lng_spans(west, east)
+
+    coords = Q()
+    for span_west, span_east in spans:
+        coords |= Q(
+            **{
+                f"{prefix}longitude__gte": span_west,
+                f"{prefix}longitude__lte": span_east,
+            }
+        )
+    condition = Q(
+        **{f"{prefix}latitude__gte": south, f"{prefix}latitude__lte": north}
+    ) & coords
+
+    first_row, last_row = _grid_row(south), _grid_row(north)
+    if last_row - first_row + 1 > GRID_MAX_ROWS:
+        return condition
+
+    cells = Q()
+    for row in range(first_row, last_row + 1):
+        for span_west, span_east in spans:
+            cells |= Q(
+                **{
+                    f"{prefix}grid_cell__range": (
+                        row * GRID_COLS + _grid_col(span_west),
+                        row * GRID_COLS + _grid_col(span_east),
+                    )
+                }
+            )
+    return cells & condition
+
+
+# Тайлы веб-меркатора (z/x/y), используются для кластеризации
+MERCATOR_MAX_LAT = 85.0511287798
+
+
+def tile_for(lat, lng, zoom):
+    """Координаты тайла (x, y), в который попадает точка"""
+    n = 2 ** zoom
+    lat = min(max(float(lat), -MERCATOR_MAX_LAT), MERCATOR_MAX_LAT)
+    x = int((float(lng) + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x, y, zoom):
+    """
+    Границы тайла (west, south, east, north).
+    Крайние тайлы расширяются до полюсов, чтобы покрыть все точки.
+    """
+    n = 2 ** zoom
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    if y == 0:
+        north = 90.0
+    if y == n - 1:
+        south = -90.0
+    return west, south, east, north
+
+
+def tiles_for_bbox(bbox, zoom, limit=None):
+    """
+    Список тайлов (x, y), покрывающих прямоугольник.
+    Бросает ValueError, если тайлов больше limit.
+    """
+    west, south, east, north = bbox
+    _, top = tile_for(north, west, zoom)
+    _, bottom = tile_for(south, west, zoom)
+    columns = []
+    for span_west, span_east in _lng_spans(west, east):
+        left, _ = tile_for(north, span_west, zoom)
+        right, _ = tile_for(north, span_east, zoom)
+        columns.extend(range(left, right + 1))
+    if limit is not None and len(columns) * (bottom - top + 1) > limit:
+        raise ValueError("bbox covers too many tiles for this zoom")
+    return [(x, y) for x in columns for y in range(top, bottom + 1)]
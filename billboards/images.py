@@ -0,0 +1,105 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Варианты изображения: имя -> максимальная сторона в пикселях
+IMAGE_VARIANTS = {
+    "thumbnail": 160,
+    "card": 480,
+    "full": 1600,
+}
+
+# Форматы вариантов: расширение -> (формат Pillow, параметры сохранения)
+IMAGE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_path(original_name, variant, ext):
+    """Путь варианта рядом с оригиналом: billboards/<id>/variants/<имя>-<вариант>.<ext>"""
+    directory, filename = os.path.split(original_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "variants", f"{stem}-{variant}.{ext}")
+
+
+def _encode(image, fmt, options):
+    if fmt == "JPEG" and image.mode != "RGB":
+        # JPEG не поддерживает прозрачность — подкладываем белый фон
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    elif fmt == "WEBP" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    buffer = BytesIO()
+    # exif не передаём — метаданные (включая геотеги) в варианты не попадают
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def build_variants(name, storage=None):
+    """
+    Создаёт уменьшенные WebP/JPEG-варианты загруженного изображения.
+    Ориентация из EXIF применяется к пикселям, сами метаданные удаляются.
+    Возвращает описание вариантов для сохранения в BillboardImage.variants.
+    """
+    storage = storage or default_storage
+    with storage.open(name, "rb") as source:
+        with Image.open(source) as original:
+            original = ImageOps.exif_transpose(original)
+            original.load()
+
+    variants = {}
+    for variant, max_side in IMAGE_VARIANTS.items():
+        image = original.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        files = {}
+        for ext, (fmt, options) in IMAGE_FORMATS.items():
+            path = variant_path(name, variant, ext)
+            if storage.exists(path):
+                storage.delete(path)
+            files[ext] = storage.save(path, ContentFile(_encode(image, fmt, options)))
+        variants[variant] = {"width": image.width, "height": image.height, **files}
+    return variants
+
+
+def variant_urls(image, build_url=None):
+    """
+    URL вариантов изображения и srcset для адаптивной загрузки.
+    Если варианты ещё не готовы, все ссылки указывают на оригинал.
+    """
+    build_url = build_url or (lambda url: url)
+    storage = image.image.storage
+    original = build_url(image.image.url)
+
+    if not image.variants:
+        return {
+            "original": original,
+            "thumbnail": original,
+            "card": original,
+            "full": original,
+            "srcset": "",
+            "srcset_webp": "",
+        }
+
+    urls = {"original": original}
+    srcset = []
+    srcset_webp = []
+    for name in IMAGE_VARIANTS:
+        variant = image.variants.get(name)
+        if not variant:
+            urls[name] = original
+            continue
+        jpg_url = build_url(storage.url(variant["jpg"]))
+        webp_url = build_url(storage.url(variant["webp"]))
+        urls[name] = jpg_url
+        urls[f"{name}_webp"] = webp_url
+        srcset.append(f"{jpg_url} {variant['width']}w")
+        srcset_webp.append(f"{webp_url} {variant['width']}w")
+    urls["srcset"] = ", ".join(srcset)
+    urls["srcset_webp"] = ", ".join(srcset_webp)
+    return urls
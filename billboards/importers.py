@@ -0,0 +1,252 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from .geo import grid_cell
+from .models import Billboard, Category, Contractor, Employee
+from .rollups import snapshot
+from .serializers import BillboardImportSerializer
+from .signals import billboards_bulk_changed
+
+IMPORT_FORMATS = ("csv", "xlsx", "geojson")
+
+# Альтернативные названия столбцов
+FIELD_ALIASES = {
+    "lat": "latitude",
+    "lng": "longitude",
+    "lon": "longitude",
+    "category_slug": "category",
+    "contractor_inn": "contractor",
+    "inn": "contractor",
+    "employee_email": "employee",
+}
+
+DECIMAL_FIELDS = ("width", "height", "latitude", "longitude", "price")
+COORDINATE_PRECISION = Decimal("0.0000001")
+
+
+class ImportFormatError(ValueError):
+    """Файл не удаётся прочитать в указанном формате"""
+
+
+def detect_format(filename):
+    ext = os.path.splitext(filename or "")[1].lower().lstrip(".")
+    if ext == "json":
+        ext = "geojson"
+    if ext not in IMPORT_FORMATS:
+        raise ImportFormatError(
+            f"Unsupported file format, expected one of: {', '.join(IMPORT_FORMATS)}"
+        )
+    return ext
+
+
+def _normalize(row):
+    data = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = str(key).strip().lower()
+        key = FIELD_ALIASES.get(key, key)
+        if isinstance(value, datetime):
+            value = value.date()
+        if isinstance(value, date):
+            value = value.isoformat()
+        if isinstance(value, str):
+            value = value.strip()
+            if key in DECIMAL_FIELDS:
+                value = value.replace(" ", "").replace(",", ".")
+        if value in ("", None):
+            continue
+        if key in ("latitude", "longitude"):
+            # Координаты из GIS часто точнее 7 знаков, допустимых моделью
+            try:
+                value = str(Decimal(str(value)).quantize(COORDINATE_PRECISION))
+            except InvalidOperation:
+                pass
+        data[key] = value
+    return data
+
+
+def _read_csv(fp):
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.DictReader(text, dialect=dialect)
+
+
+def _read_xlsx(fp):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import requires the openpyxl package")
+
+    workbook = load_workbook(fp, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        for values in rows:
+            if any(value is not None for value in values):
+                yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def _iter_json_array(text, buffer):
+    """Потоково разбирает элементы JSON-массива, начиная сразу после '['"""
+    decoder = json.JSONDecoder()
+    position = 0
+    while True:
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer):
+                break
+            chunk = text.read(65536)
+            if not chunk:
+                raise ImportFormatError("Unexpected end of GeoJSON file")
+            buffer, position = buffer[position:] + chunk, 0
+
+        if buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = text.read(65536)
+            if not chunk:
+                raise ImportFormatError("Invalid GeoJSON feature")
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        buffer, position = buffer[end:], 0
+
+
+def _read_geojson(fp):
+    """
+    FeatureCollection читается потоково: в памяти одновременно находится
+    только текущий объект Feature
+    """
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig")
+    buffer = ""
+    while '"features"' not in buffer:
+        chunk = text.read(65536)
+        if not chunk:
+            raise ImportFormatError("GeoJSON FeatureCollection expected")
+        buffer += chunk
+    buffer = buffer[buffer.index('"features"') + len('"features"') :]
+    while "[" not in buffer:
+        chunk = text.read(65536)
+        if not chunk:
+            raise ImportFormatError("GeoJSON FeatureCollection expected")
+        buffer += chunk
+    buffer = buffer[buffer.index("[") + 1 :]
+
+    for feature in _iter_json_array(text, buffer):
+        row = dict(feature.get("properties") or {})
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            coordinates = geometry.get("coordinates") or []
+            if len(coordinates) >= 2:
+                row["longitude"], row["latitude"] = coordinates[0], coordinates[1]
+        yield row
+
+
+READERS = {"csv": _read_csv, "xlsx": _read_xlsx, "geojson": _read_geojson}
+
+
+def read_rows(fp, fmt):
+    """Строки файла как словари полей билборда (номер строки, данные)"""
+    for number, row in enumerate(READERS[fmt](fp), start=1):
+        yield number, _normalize(row)
+
+
+def build_lookups():
+    """
+    Карты справочников для разрешения ссылок без запросов на каждую строку:
+    категория по slug/id/названию, контрагент по ИНН/id/названию,
+    сотрудник по email/id
+    """
+    categories = {}
+    for category in Category.objects.all():
+        categories[category.name.lower()] = category
+        categories[str(category.pk)] = category
+        categories[category.slug.lower()] = category
+
+    contractors = {}
+    for contractor in Contractor.objects.all():
+        contractors.setdefault(contractor.name.lower(), contractor)
+        contractors[str(contractor.pk)] = contractor
+        if contractor.inn:
+            contractors[contractor.inn.strip().lower()] = contractor
+
+    employees = {}
+    for employee in Employee.objects.all():
+        employees[str(employee.pk)] = employee
+        employees[employee.email.lower()] = employee
+
+    return {"category": categories, "contractor": contractors, "employee": employees}
+
+
+class BillboardImporter:
+    """
+    Массовый импорт билбордов: строки читаются потоком, проверяются пачками
+    по правилам BillboardSerializer и сохраняются через bulk_create
+    (одна транзакция на пачку). Память не зависит от размера файла.
+    """
+
+    def __init__(self, chunk_size=500, dry_run=False, on_error=None):
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.on_error = on_error
+        # Один экземпляр сериализатора на весь импорт: поля строятся один раз
+        self.serializer = BillboardImportSerializer(context={"lookups": build_lookups()})
+        self.created = 0
+        self.failed = 0
+
+    def run(self, rows):
+        chunk = []
+        for number, data in rows:
+            chunk.append((number, data))
+            if len(chunk) >= self.chunk_size:
+                self._process(chunk)
+                chunk = []
+        if chunk:
+            self._process(chunk)
+        return {"created": self.created, "failed": self.failed}
+
+    def _process(self, chunk):
+        billboards = []
+        for number, data in chunk:
+            try:
+                validated = self.serializer.run_validation(data)
+            except ValidationError as exc:
+                self.failed += 1
+                if self.on_error:
+                    self.on_error({"row": number, "errors": exc.detail})
+                continue
+            billboard = Billboard(**validated)
+            billboard.grid_cell = grid_cell(billboard.latitude, billboard.longitude)
+            billboards.append(billboard)
+
+        if self.dry_run or not billboards:
+            self.created += len(billboards)
+            return
+
+        with transaction.atomic():
+            Billboard.objects.bulk_create(billboards)
+            billboards_bulk_changed(
+                billboards,
+                rollup_changes=[(None, snapshot(billboard)) for billboard in billboards],
+            )
+        self.created += len(billboards)
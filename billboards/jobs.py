@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import bump_version
+from .images import build_variants
+from .models import BillboardImage, ImageJob
+
+# Задержка перед повтором: RETRY_DELAY * 2^(номер попытки - 1)
+RETRY_DELAY = timedelta(seconds=30)
+# Задача в статусе running дольше этого времени считается брошенной
+STALE_AFTER = timedelta(minutes=15)
+
+
+def claim_jobs(limit):
+    """
+    Забирает до limit готовых к запуску задач.
+    Каждая задача захватывается условным UPDATE, поэтому несколько
+    воркеров могут работать с одной очередью без внешнего брокера.
+    """
+    now = timezone.now()
+    candidates = ImageJob.objects.filter(status="queued", run_after__lte=now).values_list(
+        "id", flat=True
+    )[: limit * 2]
+
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        if ImageJob.objects.filter(pk=job_id, status="queued").update(
+            status="running", locked_at=now, updated_at=now
+        ):
+            claimed.append(job_id)
+
+    jobs = list(ImageJob.objects.filter(pk__in=claimed).select_related("image"))
+    BillboardImage.objects.filter(jobs__in=claimed).update(
+        processing_status="processing", updated_at=now
+    )
+    return jobs
+
+
+def requeue_stale_jobs():
+    """Возвращает в очередь задачи, зависшие после падения воркера"""
+    return ImageJob.objects.filter(
+        status="running", locked_at__lt=timezone.now() - STALE_AFTER
+    ).update(status="queued", locked_at=None, updated_at=timezone.now())
+
+
+def complete_job(job, variants):
+    now = timezone.now()
+    with transaction.atomic():
+        BillboardImage.objects.filter(pk=job.image_id).update(
+            variants=variants, processing_status="ready", updated_at=now
+        )
+        ImageJob.objects.filter(pk=job.pk).update(
+            status="done",
+            attempts=job.attempts + 1,
+            locked_at=None,
+            last_error="",
+            updated_at=now,
+        )
+    bump_version(BillboardImage)
+
+
+def fail_job(job, error):
+    """Планирует повтор с экспоненциальной задержкой или помечает задачу ошибочной"""
+    attempts = job.attempts + 1
+    now = timezone.now()
+    with transaction.atomic():
+        if attempts < job.max_attempts:
+            ImageJob.objects.filter(pk=job.pk).update(
+                status="queued",
+                attempts=attempts,
+                run_after=now + RETRY_DELAY * 2 ** (attempts - 1),
+                locked_at=None,
+                last_error=error,
+                updated_at=now,
+            )
+            BillboardImage.objects.filter(pk=job.image_id).update(
+                processing_status="pending", updated_at=now
+            )
+        else:
+            ImageJob.objects.filter(pk=job.pk).update(
+                status="failed",
+                attempts=attempts,
+                locked_at=None,
+                last_error=error,
+                updated_at=now,
+            )
+            BillboardImage.objects.filter(pk=job.image_id).update(
+                processing_status="failed", updated_at=now
+            )
+
+
+def init_worker():
+    """Инициализация Django в дочернем процессе пула (для spawn-режима)"""
+    import django
+
+    django.setup()
+
+
+def process_image(name):
+    """Выполняется в процессе пула: только работа с файлами, без базы данных"""
+    return build_variants(name)
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from billboards.benchmarks import (
+    DEFAULT_VOLUMES,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    run_throughput,
+    save_baseline,
+    seed_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеры API: количество SQL-запросов, задержка p50/p95 и размер ответа "
+        "для всех эндпоинтов роутера. Выполняется на временной базе с тестовыми "
+        "данными и сравнивается с базовой линией."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--iterations", type=int, default=20, help="Замеров на эндпоинт"
+        )
+        parser.add_argument(
+            "--baseline",
+            default=str(settings.BASE_DIR / "benchmarks" / "baseline.json"),
+            help="Файл базовой линии",
+        )
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Сохранить результаты как новую базовую линию",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Допустимый рост p95 и размера ответа (доля, 0.5 = 50%%)",
+        )
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=0, help="Зерно генератора")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=0,
+            help="Дополнительно сравнить пропускную способность синхронных "
+            "и асинхронных эндпоинтов при стольких одновременных запросах",
+        )
+        parser.add_argument(
+            "--throughput-requests",
+            type=int,
+            default=200,
+            help="Запросов на эндпоинт при замере пропускной способности",
+        )
+
+    def handle(self, *args, **options):
+        volumes = {name: options[name] for name in DEFAULT_VOLUMES}
+
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            seed_data(volumes, seed=options["seed"])
+            results = run_benchmarks(options["iterations"])
+            throughput = None
+            if options["concurrency"] > 0:
+                throughput = run_throughput(
+                    options["concurrency"], options["throughput_requests"]
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(
+            f"{'эндпоинт':<70} {'код':>4} {'SQL':>4} {'p50 мс':>8} {'p95 мс':>8} {'байт':>9}"
+        )
+        for label, result in results.items():
+            self.stdout.write(
+                f"{label:<70} {result['status']:>4} {result['queries']:>4} "
+                f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['bytes']:>9}"
+            )
+
+        if throughput:
+            self.stdout.write(
+                f"\nПропускная способность, запросов/с "
+                f"(одновременно {options['concurrency']}):"
+            )
+            self.stdout.write(f"{'эндпоинт':<30} {'sync':>10} {'async':>10}")
+            for name, row in throughput.items():
+                self.stdout.write(f"{name:<30} {row['sync']:>10} {row['async']:>10}")
+
+        path = options["baseline"]
+        if options["update_baseline"]:
+            save_baseline(path, volumes, results)
+            self.stdout.write(self.style.SUCCESS(f"Базовая линия сохранена в {path}"))
+            return
+
+        baseline = load_baseline(path)
+        if baseline is None:
+            self.stdout.write(
+                f"Базовая линия {path} не найдена, запустите с --update-baseline"
+            )
+            return
+        if baseline.get("volumes") != volumes:
+            self.stdout.write(
+                self.style.WARNING("Объёмы данных отличаются от базовой линии")
+            )
+
+        regressions = compare(results, baseline["results"], options["tolerance"])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f"Регрессий: {len(regressions)}")
+        self.stdout.write(self.style.SUCCESS("Регрессий нет"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from billboards.images import build_variants
+from billboards.models import BillboardImage, ImageJob
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные WebP/JPEG-варианты для изображений билбордов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Пересоздать варианты и для изображений, у которых они уже есть",
+        )
+        parser.add_argument(
+            "--queue",
+            action="store_true",
+            help="Не обрабатывать сразу, а поставить задачи в очередь воркера",
+        )
+
+    def handle(self, *args, **options):
+        queryset = BillboardImage.objects.order_by("id")
+        if not options["all"]:
+            queryset = queryset.filter(variants={})
+
+        if options["queue"]:
+            queued = 0
+            for image in queryset.iterator():
+                ImageJob.enqueue(image)
+                queued += 1
+            self.stdout.write(self.style.SUCCESS(f"Поставлено в очередь: {queued}"))
+            return
+
+        built = failed = 0
+        for image in queryset.iterator():
+            try:
+                variants = build_variants(image.image.name, image.image.storage)
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f"Изображение #{image.pk}: {exc}")
+                continue
+            BillboardImage.objects.filter(pk=image.pk).update(
+                variants=variants, processing_status="ready", updated_at=timezone.now()
+            )
+            built += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово: {built}, с ошибками: {failed}")
+        )
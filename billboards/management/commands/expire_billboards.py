@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billboards.expiry import expired_queryset, sweep_expired
+
+
+class Command(BaseCommand):
+    help = "Переводит билборды с истёкшей арендой в статус «Истёк»"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Количество билбордов в одной транзакции",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Работать постоянно, повторяя проверку через --interval секунд",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=3600.0,
+            help="Пауза между проверками в режиме --loop",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, сколько билбордов истекло",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            self.stdout.write(f"Истёкших билбордов: {expired_queryset().count()}")
+            return
+
+        while True:
+            expired = sweep_expired(batch_size=options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Переведено в статус «Истёк»: {expired}")
+            )
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
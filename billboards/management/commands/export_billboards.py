@@ -0,0 +1,63 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billboards.exporters import EXPORT_FORMATS, stream_export
+from billboards.filters import filter_billboards
+from billboards.models import Billboard
+
+FILTERS = (
+    "category",
+    "status",
+    "employee",
+    "contractor",
+    "search",
+    "near",
+    "radius",
+    "nearest",
+)
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка билбордов в CSV, NDJSON или GeoJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            help="Формат выгрузки (по умолчанию по расширению файла или csv)",
+        )
+        parser.add_argument(
+            "--output", "-o", help="Файл выгрузки, по умолчанию stdout"
+        )
+        for name in FILTERS:
+            parser.add_argument(f"--{name}", help=f"Фильтр {name}, как в API")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        fmt = options["format"]
+        if fmt is None and output:
+            fmt = os.path.splitext(output)[1].lower().lstrip(".")
+            if fmt == "json":
+                fmt = "geojson"
+            if fmt not in EXPORT_FORMATS:
+                raise CommandError("Не удалось определить формат, укажите --format")
+        fmt = fmt or "csv"
+
+        try:
+            queryset = filter_billboards(
+                Billboard.objects.all(),
+                {name: options[name] for name in FILTERS if options[name]},
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if not output:
+            for chunk in stream_export(queryset, fmt):
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(output, "w", encoding="utf-8", newline="") as fp:
+            for chunk in stream_export(queryset, fmt):
+                fp.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Выгрузка сохранена в {output}"))
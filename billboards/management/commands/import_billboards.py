@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from billboards.importers import (
+    IMPORT_FORMATS,
+    BillboardImporter,
+    ImportFormatError,
+    detect_format,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Массовый импорт билбордов из CSV, XLSX или GeoJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу импорта")
+        parser.add_argument(
+            "--format",
+            choices=IMPORT_FORMATS,
+            help="Формат файла (по умолчанию определяется по расширению)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Количество строк в одной транзакции",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только проверить строки, ничего не сохраняя",
+        )
+        parser.add_argument(
+            "--errors",
+            help="Файл для отчёта об ошибках (JSON Lines), по умолчанию stderr",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            fmt = options["format"] or detect_format(path)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+
+        report = open(options["errors"], "w", encoding="utf-8") if options["errors"] else None
+
+        def on_error(error):
+            line = json.dumps(error, ensure_ascii=False)
+            if report:
+                report.write(line + "\n")
+            else:
+                self.stderr.write(line)
+
+        try:
+            with open(path, "rb") as fp:
+                result = BillboardImporter(
+                    chunk_size=options["chunk_size"],
+                    dry_run=options["dry_run"],
+                    on_error=on_error,
+                ).run(read_rows(fp, fmt))
+        except (OSError, ImportFormatError) as exc:
+            raise CommandError(str(exc))
+        finally:
+            if report:
+                report.close()
+
+        prefix = "Проверено" if options["dry_run"] else "Импортировано"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}: {result['created']}, с ошибками: {result['failed']}"
+            )
+        )
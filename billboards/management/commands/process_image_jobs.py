@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from billboards.jobs import (
+    claim_jobs,
+    complete_job,
+    fail_job,
+    init_worker,
+    process_image,
+    requeue_stale_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = "Воркер фоновой обработки изображений билбордов (очередь в базе данных)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Количество процессов обработки",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Сколько задач забирать из очереди за раз (по умолчанию workers * 2)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Пауза в секундах, когда очередь пуста",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Обработать готовые задачи и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        batch_size = options["batch_size"] or workers * 2
+        done = failed = 0
+
+        # Дочерние процессы не должны наследовать открытые соединения с базой
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            while True:
+                requeue_stale_jobs()
+                jobs = claim_jobs(batch_size)
+                if not jobs:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+
+                futures = {
+                    pool.submit(process_image, job.image.image.name): job for job in jobs
+                }
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        variants = future.result()
+                    except Exception as exc:
+                        failed += 1
+                        fail_job(job, f"{type(exc).__name__}: {exc}")
+                        self.stderr.write(f"Задача #{job.pk}: {exc}")
+                    else:
+                        done += 1
+                        complete_job(job, variants)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Обработано: {done}, с ошибками: {failed}")
+        )
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from billboards.models import SyncTombstone
+
+
+class Command(BaseCommand):
+    help = "Удаляет записи об удалении старше срока хранения ленты синхронизации"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.SYNC_TOMBSTONE_DAYS,
+            help="Срок хранения в днях (по умолчанию SYNC_TOMBSTONE_DAYS)",
+        )
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=threshold).delete()
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей: {deleted}"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from billboards.geo import grid_cell
+from billboards.models import Billboard
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает ячейки геосетки для всех билбордов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество билбордов, обновляемых за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = Billboard.objects.only("id", "latitude", "longitude", "grid_cell")
+
+        updated = 0
+        batch = []
+        for billboard in queryset.order_by("id").iterator(chunk_size=batch_size):
+            cell = grid_cell(billboard.latitude, billboard.longitude)
+            if billboard.grid_cell == cell:
+                continue
+            billboard.grid_cell = cell
+            batch.append(billboard)
+            if len(batch) >= batch_size:
+                Billboard.objects.bulk_update(batch, ["grid_cell"])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Billboard.objects.bulk_update(batch, ["grid_cell"])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Обновлено билбордов: {updated}"))
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from billboards.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает сводки занятости и выручки (запускать раз в сутки)"
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Сводки пересчитаны: {created} строк за {time.monotonic() - started:.1f} с"
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from billboards.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс билбордов"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Индекс перестроен ({type(backend).__name__})")
+        )
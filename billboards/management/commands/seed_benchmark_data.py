@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from billboards.benchmarks import DEFAULT_VOLUMES, seed_data
+from billboards.models import Billboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет пустую базу тестовыми данными для замеров производительности "
+        "(например, DB_NAME=benchmark.sqlite3)"
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=default,
+                help=f"Количество ({name}); images и bookings — на один билборд",
+            )
+        parser.add_argument("--seed", type=int, default=0, help="Зерно генератора")
+
+    def handle(self, *args, **options):
+        if Billboard.objects.exists():
+            raise CommandError(
+                "База уже содержит билборды, используйте отдельную базу (DB_NAME)"
+            )
+        volumes = seed_data(
+            {name: options[name] for name in DEFAULT_VOLUMES}, seed=options["seed"]
+        )
+        summary = ", ".join(f"{name}: {value}" for name, value in volumes.items())
+        self.stdout.write(self.style.SUCCESS(f"Данные созданы ({summary})"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from billboards import reference
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет общий кэш сериализованными справочниками (категории, "
+        "контрагенты, сотрудники), чтобы воркеры не строили их сами"
+    )
+
+    def handle(self, *args, **options):
+        for model, count in reference.warm().items():
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {count}")
+        self.stdout.write(self.style.SUCCESS("Кэш справочников прогрет"))
@@ -0,0 +1,65 @@
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast, Round
+
+from .models import Billboard, Category
+
+# Коды статусов в компактном формате: индекс в этом списке
+STATUS_CODES = [status for status, _ in Billboard.STATUS_CHOICES]
+# Точность координат (6 знаков ~ 10 см)
+COORDINATE_DIGITS = 6
+
+
+def _coordinate(field):
+    return Cast(Round(field, COORDINATE_DIGITS), FloatField())
+
+
+def compact_markers(queryset, limit=None):
+    """
+    Маркеры карты в колоночном виде: параллельные массивы id, lat, lng,
+    status (код) и category (id) плюс словарь категорий.
+    Координаты и коды статусов вычисляет база, строки читаются через
+    values_list без создания моделей и сериализаторов.
+    При limit возвращается не больше limit маркеров, truncated — признак
+    того, что в выборке их больше.
+    """
+    rows = (
+        queryset.order_by("id")
+        .prefetch_related(None)
+        .annotate(
+            marker_lat=_coordinate("latitude"),
+            marker_lng=_coordinate("longitude"),
+            marker_status=Case(
+                *[
+                    When(status=status, then=Value(code))
+                    for code, status in enumerate(STATUS_CODES)
+                ],
+                default=Value(-1),
+                output_field=IntegerField(),
+            ),
+        )
+        .values_list("id", "marker_lat", "marker_lng", "marker_status", "category_id")
+    )
+    truncated = False
+    if limit is not None:
+        rows = list(rows[: limit + 1])
+        truncated = len(rows) > limit
+        rows = rows[:limit]
+    columns = list(zip(*rows)) or [(), (), (), (), ()]
+    ids, lats, lngs, statuses, categories = map(list, columns)
+
+    return {
+        "count": len(ids),
+        "truncated": truncated,
+        "statuses": STATUS_CODES,
+        "categories": {
+            str(category["id"]): category
+            for category in Category.objects.filter(id__in=set(categories)).values(
+                "id", "name", "slug", "color", "icon"
+            )
+        },
+        "id": ids,
+        "lat": lats,
+        "lng": lngs,
+        "status": statuses,
+        "category": categories,
+    }
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+
+slow_logger = logging.getLogger("billboards.slow")
+
+# Границы корзин гистограмм
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (1024, 10240, 102400, 512000, 1048576, 5242880)
+
+LABELS = ("view", "action", "method")
+
+
+class Histogram:
+    """Гистограмма в памяти процесса в формате Prometheus (накопительные корзины)"""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            series = sorted(
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self.series.items()
+            )
+        for labels, counts, total, count in series:
+            base = ",".join(
+                f'{name}="{_escape(value)}"' for name, value in zip(LABELS, labels)
+            )
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "billboards_request_duration_seconds",
+    "Полное время обработки запроса",
+    DURATION_BUCKETS,
+)
+SQL_QUERIES = Histogram(
+    "billboards_sql_queries", "Количество SQL-запросов на запрос", QUERY_BUCKETS
+)
+SQL_DURATION = Histogram(
+    "billboards_sql_duration_seconds", "Время выполнения SQL", DURATION_BUCKETS
+)
+VIEW_PYTHON_DURATION = Histogram(
+    "billboards_view_python_seconds",
+    "Время представления без SQL: сериализаторы, построение URL изображений",
+    DURATION_BUCKETS,
+)
+SERIALIZATION_DURATION = Histogram(
+    "billboards_serialization_duration_seconds",
+    "Время рендеринга ответа (JSON)",
+    DURATION_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "billboards_response_bytes", "Размер тела ответа", SIZE_BUCKETS
+)
+
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    SQL_QUERIES,
+    SQL_DURATION,
+    VIEW_PYTHON_DURATION,
+    SERIALIZATION_DURATION,
+    RESPONSE_SIZE,
+)
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: считает запросы и их время, при необходимости SQL"""
+
+    def __init__(self, keep_sql):
+        self.keep_sql = keep_sql
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if self.keep_sql:
+                self.queries.append((elapsed, sql))
+
+
+def _labels(request):
+    """Метки запроса: ViewSet и действие DRF (list, statistics, expiring_soon, ...)"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return ("unmatched", "", request.method)
+    func = match.func
+    view = getattr(getattr(func, "cls", None), "__name__", None) or match.view_name
+    action = (getattr(func, "actions", None) or {}).get(request.method.lower(), "")
+    return (view, action, request.method)
+
+
+class PerformanceMiddleware:
+    """
+    Собирает для каждого запроса количество и время SQL, время представления
+    без SQL, время рендеринга и размер ответа в гистограммы по ViewSet
+    и действию. Медленные запросы (SLOW_REQUEST_THRESHOLD_MS > 0)
+    пишутся в лог billboards.slow вместе с SQL.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = self.start(request)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            self.install_recorder(stack, recorder)
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        recorder = self.start(request)
+        started = time.perf_counter()
+        # ORM в асинхронном режиме выполняет SQL в потоке запроса
+        # (ThreadSensitiveContext), поэтому обёртка ставится в этом же потоке
+        stack = ExitStack()
+        await sync_to_async(self.install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, recorder, started)
+
+    def start(self, request):
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+        recorder = QueryRecorder(keep_sql=threshold > 0)
+        request._metrics = {"recorder": recorder, "view": None, "render": None}
+        return recorder
+
+    def install_recorder(self, stack, recorder):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+
+    def finish(self, request, response, recorder, started):
+        finished = time.perf_counter()
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+
+        labels = _labels(request)
+        duration = finished - started
+        REQUEST_DURATION.observe(labels, duration)
+        SQL_QUERIES.observe(labels, recorder.count)
+        SQL_DURATION.observe(labels, recorder.duration)
+
+        marks = request._metrics
+        if marks["view"] is not None:
+            view_started, view_queries_time = marks["view"]
+            view_finished, view_finished_queries_time = marks["render"] or (
+                finished,
+                recorder.duration,
+            )
+            VIEW_PYTHON_DURATION.observe(
+                labels,
+                max(
+                    0.0,
+                    (view_finished - view_started)
+                    - (view_finished_queries_time - view_queries_time),
+                ),
+            )
+        if marks["render"] is not None:
+            SERIALIZATION_DURATION.observe(labels, finished - marks["render"][0])
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+
+        if threshold > 0 and duration * 1000 >= threshold:
+            self.log_slow_request(request, response, duration, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        marks = request._metrics
+        marks["view"] = (time.perf_counter(), marks["recorder"].duration)
+
+    def process_template_response(self, request, response):
+        # Ответ DRF рендерится после этого хука
+        marks = request._metrics
+        marks["render"] = (time.perf_counter(), marks["recorder"].duration)
+        return response
+
+    def log_slow_request(self, request, response, duration, recorder):
+        slowest = sorted(recorder.queries, reverse=True)[
+            : getattr(settings, "SLOW_REQUEST_MAX_QUERIES", 20)
+        ]
+        slow_logger.warning(
+            "%s %s %s: %.1f мс, SQL: %d запросов, %.1f мс\n%s",
+            request.method,
+            request.get_full_path(),
+            response.status_code,
+            duration * 1000,
+            recorder.count,
+            recorder.duration * 1000,
+            "\n".join(f"  {elapsed * 1000:.1f} мс  {sql}" for elapsed, sql in slowest),
+        )
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    """
+    Метрики процесса в текстовом формате Prometheus.
+    Доступ по заголовку Authorization: Bearer METRICS_TOKEN; без токена
+    эндпоинт открыт только при DEBUG, иначе 404
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(
+        render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
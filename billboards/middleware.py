@@ -0,0 +1,13 @@
+from django.middleware.gzip import GZipMiddleware
+
+
+class ApiGZipMiddleware(GZipMiddleware):
+    """
+    Сжатие gzip только для ответов API (Accept-Encoding: gzip).
+    HTML-страницы админки с CSRF-токенами не сжимаются (атака BREACH).
+    """
+
+    def process_response(self, request, response):
+        if not request.path.startswith("/api/"):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,258 @@
+# Generated by Django 4.2.7 on 2026-10-17 07:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+from billboards.geo import grid_cell
+
+
+def fill_grid_cells(apps, schema_editor):
+    """
+    Ячейки геосетки для билбордов, созданных до появления поля: без них
+    билборды не попадают в viewport, near и кластеры
+    """
+    Billboard = apps.get_model('billboards', 'Billboard')
+    batch = []
+    queryset = Billboard.objects.filter(grid_cell__isnull=True).only('id', 'latitude', 'longitude')
+    for billboard in queryset.order_by('id').iterator(chunk_size=1000):
+        billboard.grid_cell = grid_cell(billboard.latitude, billboard.longitude)
+        batch.append(billboard)
+        if len(batch) >= 1000:
+            Billboard.objects.bulk_update(batch, ['grid_cell'])
+            batch = []
+    if batch:
+        Billboard.objects.bulk_update(batch, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billboards', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'День'), ('month', 'Месяц')], max_length=10, verbose_name='Период')),
+                ('date', models.DateField(verbose_name='Начало периода')),
+                ('dimension', models.CharField(choices=[('total', 'Всего'), ('category', 'Категория'), ('contractor', 'Контрагент'), ('employee', 'Сотрудник')], max_length=20, verbose_name='Разрез')),
+                ('key', models.BigIntegerField(default=0, verbose_name='Ключ')),
+                ('billboards', models.IntegerField(default=0, verbose_name='Занятых билбордов')),
+                ('billboard_days', models.IntegerField(default=0, verbose_name='Билбордо-дней')),
+                ('revenue', models.DecimalField(decimal_places=4, default=0, max_digits=18, verbose_name='Выручка (сум)')),
+            ],
+            options={
+                'verbose_name': 'Сводка занятости',
+                'verbose_name_plural': 'Сводки занятости',
+                'ordering': ['dimension', 'period', 'date', 'key'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BillboardStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_status', models.CharField(choices=[('active', 'Активен'), ('pending', 'Ожидание'), ('expired', 'Истёк'), ('maintenance', 'Обслуживание')], max_length=20, verbose_name='Прежний статус')),
+                ('new_status', models.CharField(choices=[('active', 'Активен'), ('pending', 'Ожидание'), ('expired', 'Истёк'), ('maintenance', 'Обслуживание')], max_length=20, verbose_name='Новый статус')),
+                ('source', models.CharField(choices=[('expiry', 'Истечение срока аренды'), ('manual', 'Изменение вручную')], default='manual', max_length=20, verbose_name='Источник')),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Смена статуса',
+                'verbose_name_plural': 'Смены статусов',
+                'ordering': ['-changed_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateField(verbose_name='Дата начала')),
+                ('end_date', models.DateField(verbose_name='Дата окончания')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='Стоимость (сум)')),
+                ('status', models.CharField(choices=[('tentative', 'Предварительное'), ('confirmed', 'Подтверждено'), ('cancelled', 'Отменено')], default='confirmed', max_length=20, verbose_name='Статус')),
+                ('notes', models.TextField(blank=True, verbose_name='Заметки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Бронирование',
+                'verbose_name_plural': 'Бронирования',
+                'ordering': ['start_date', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название')),
+                ('slug', models.SlugField(help_text='Используется в URL и API', max_length=100, unique=True, verbose_name='Слаг')),
+                ('description', models.TextField(blank=True, verbose_name='Описание')),
+                ('icon', models.CharField(blank=True, help_text='Название иконки (например: monitor, bus)', max_length=50, verbose_name='Иконка')),
+                ('color', models.CharField(default='#3b82f6', help_text='Цвет в формате HEX (#3b82f6)', max_length=7, verbose_name='Цвет')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активна')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='Порядок сортировки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Категория',
+                'verbose_name_plural': 'Категории',
+                'ordering': ['order', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Contractor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название компании')),
+                ('contact_person', models.CharField(blank=True, max_length=150, verbose_name='Контактное лицо')),
+                ('phone', models.CharField(blank=True, max_length=20, verbose_name='Телефон')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+                ('address', models.TextField(blank=True, verbose_name='Адрес')),
+                ('contract_number', models.CharField(blank=True, max_length=50, verbose_name='Номер договора')),
+                ('inn', models.CharField(blank=True, help_text='Идентификационный номер налогоплательщика', max_length=20, verbose_name='ИНН')),
+                ('website', models.URLField(blank=True, verbose_name='Веб-сайт')),
+                ('notes', models.TextField(blank=True, verbose_name='Заметки')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активен')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Контрагент',
+                'verbose_name_plural': 'Контрагенты',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=20, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='Максимум попыток')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Запустить после')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Взята в работу')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+            ],
+            options={
+                'verbose_name': 'Задача обработки изображения',
+                'verbose_name_plural': 'Задачи обработки изображений',
+                'ordering': ['run_after', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('object_id', models.BigIntegerField(verbose_name='ID объекта')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата удаления')),
+            ],
+            options={
+                'verbose_name': 'Удалённый объект',
+                'verbose_name_plural': 'Удалённые объекты',
+                'ordering': ['deleted_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='billboard',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Ячейка геосетки'),
+        ),
+        migrations.AddField(
+            model_name='billboardimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('ready', 'Готово'), ('failed', 'Ошибка')], default='pending', editable=False, max_length=20, verbose_name='Статус обработки'),
+        ),
+        migrations.AddField(
+            model_name='billboardimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddField(
+            model_name='billboardimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Уменьшенные копии в форматах WebP и JPEG', verbose_name='Варианты изображения'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата обновления'),
+        ),
+        migrations.AddIndex(
+            model_name='billboard',
+            index=models.Index(fields=['created_at', 'id'], name='billboard_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billboard',
+            index=models.Index(fields=['status', 'end_date'], name='billboard_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billboard',
+            index=models.Index(fields=['updated_at', 'id'], name='billboard_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billboardimage',
+            index=models.Index(fields=['updated_at', 'id'], name='image_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='billboards__deleted_d1b5d6_idx'),
+        ),
+        migrations.AddField(
+            model_name='imagejob',
+            name='image',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='billboards.billboardimage', verbose_name='Изображение'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='billboard',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='billboards.billboard', verbose_name='Билборд'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='contractor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='billboards.contractor', verbose_name='Контрагент'),
+        ),
+        migrations.AddField(
+            model_name='billboardstatuschange',
+            name='billboard',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='billboards.billboard', verbose_name='Билборд'),
+        ),
+        migrations.AddConstraint(
+            model_name='billboardrollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'period', 'date', 'key'), name='rollup_unique'),
+        ),
+        migrations.AddField(
+            model_name='billboard',
+            name='category',
+            field=models.ForeignKey(blank=True, help_text='Тип рекламной конструкции', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='billboards', to='billboards.category', verbose_name='Категория'),
+        ),
+        migrations.AddField(
+            model_name='billboard',
+            name='contractor',
+            field=models.ForeignKey(blank=True, help_text='Клиент, арендующий рекламную конструкцию', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='billboards', to='billboards.contractor', verbose_name='Контрагент'),
+        ),
+        migrations.AddIndex(
+            model_name='imagejob',
+            index=models.Index(fields=['status', 'run_after'], name='billboards__status_39b956_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['billboard', 'start_date', 'end_date', 'status'], name='booking_billboard_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['end_date', 'start_date'], name='booking_period_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(check=models.Q(('end_date__gte', models.F('start_date'))), name='booking_period_valid'),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,58 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .geo import grid_cell
+
+
+class BillboardsCountQuerySet(models.QuerySet):
+    """QuerySet справочников с количеством билбордов, посчитанным в том же запросе"""
+
+    def with_billboards_count(self):
+        queryset = self.annotate(num_billboards=models.Count('billboards'))
+        # Запросы с GROUP BY не используют Meta.ordering — задаём порядок явно
+        if not self.query.order_by:
+            queryset = queryset.order_by(*self.model._meta.ordering)
+        return queryset
+
+
+class BillboardQuerySet(models.QuerySet):
+    def available(self, start, end):
+        """
+        Билборды, свободные весь период [start, end]: без пересекающихся
+        бронирований, не на обслуживании и без текущей аренды на эти даты.
+
+        Активные бронирования одного билборда не пересекаются (проверяется
+        при записи), поэтому достаточно последнего бронирования, начатого
+        не позже end: билборд занят, если оно заканчивается не раньше start.
+        Для каждого билборда это один поиск по индексу бронирований.
+        """
+        booked_until = models.Subquery(
+            Booking.objects.active()
+            .filter(billboard=models.OuterRef('pk'), start_date__lte=end)
+            .order_by('-start_date')
+            .values('end_date')[:1]
+        )
+        return (
+            self.exclude(status='maintenance')
+            .exclude(
+                status__in=('active', 'pending'),
+                start_date__lte=end,
+                end_date__gte=start,
+            )
+            .alias(
+                booked_until=Coalesce(
+                    booked_until, models.Value(date.min), output_field=models.DateField()
+                )
+            )
+            .filter(booked_until__lt=start)
+        )
+
+
 class Employee(models.Model):
     """Модель сотрудника, ответственного за билборд"""
     first_name = models.CharField('Имя', max_length=100)
@@ -11,6 +62,9 @@ class Employee(models.Model):
     position = models.CharField('Должность', max_length=100, blank=True)
     is_active = models.BooleanField('Активен', default=True)
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+
+    objects = BillboardsCountQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Сотрудник'
@@ -24,6 +78,13 @@ class Employee(models.Model):
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
+    @property
+    def billboards_count(self):
+        """Количество билбордов сотрудника"""
+        if hasattr(self, 'num_billboards'):
+            return self.num_billboards
+        return self.billboards.count()
+
 class Category(models.Model):
     """Модель категории рекламных конструкций"""
     name = models.CharField('Название', max_length=100, unique=True)
@@ -36,6 +97,8 @@ class Category(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
+    objects = BillboardsCountQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Категория'
         verbose_name_plural = 'Категории'
@@ -47,6 +110,8 @@ class Category(models.Model):
     @property
     def billboards_count(self):
         """Количество билбордов в категории"""
+        if hasattr(self, 'num_billboards'):
+            return self.num_billboards
         return self.billboards.count()
 
 class Contractor(models.Model):
@@ -64,6 +129,8 @@ class Contractor(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
+    objects = BillboardsCountQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Контрагент'
         verbose_name_plural = 'Контрагенты'
@@ -75,6 +142,8 @@ class Contractor(models.Model):
     @property
     def billboards_count(self):
         """Количество билбордов контрагента"""
+        if hasattr(self, 'num_billboards'):
+            return self.num_billboards
         return self.billboards.count()
 
     @property
@@ -159,6 +228,14 @@ class Billboard(models.Model):
         decimal_places=7,
         validators=[MinValueValidator(-180), MaxValueValidator(180)]
     )
+    # Ячейка геосетки для выборок по области карты (заполняется при сохранении)
+    grid_cell = models.BigIntegerField(
+        'Ячейка геосетки',
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True
+    )
     
     # Период аренды
     start_date = models.DateField('Дата начала аренды')
@@ -186,13 +263,32 @@ class Billboard(models.Model):
     created_at = models.DateTimeField('Дата создания', auto_now_add=True)
     updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
+    objects = BillboardQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Билборд'
         verbose_name_plural = 'Билборды'
         ordering = ['-created_at']
+        indexes = [
+            # Ключ курсорной пагинации
+            models.Index(fields=['created_at', 'id'], name='billboard_created_id_idx'),
+            # Выборка истекающих и истёкших аренд (expiring_soon, expire_billboards)
+            models.Index(fields=['status', 'end_date'], name='billboard_status_end_idx'),
+            # Лента изменений для синхронизации клиентов
+            models.Index(fields=['updated_at', 'id'], name='billboard_updated_id_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.category.name} #{self.id} - {self.title}"
+        category = self.category.name if self.category_id else "Без категории"
+        return f"{category} #{self.id} - {self.title}"
+
+    def save(self, *args, **kwargs):
+        # Поддерживаем геоиндекс в актуальном состоянии
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'grid_cell'}
+        super().save(*args, **kwargs)
 
     @property
     def size_display(self):
@@ -221,6 +317,14 @@ def billboard_image_upload_path(instance, filename):
 
 class BillboardImage(models.Model):
     """Модель изображений билборда"""
+
+    PROCESSING_STATUS_CHOICES = [
+        ('pending', 'Ожидает обработки'),
+        ('processing', 'Обрабатывается'),
+        ('ready', 'Готово'),
+        ('failed', 'Ошибка'),
+    ]
+
     billboard = models.ForeignKey(
         Billboard, 
         on_delete=models.CASCADE, 
@@ -235,12 +339,31 @@ class BillboardImage(models.Model):
     alt_text = models.CharField('Альтернативный текст', max_length=200, blank=True)
     order = models.PositiveIntegerField('Порядок', default=0)
     is_primary = models.BooleanField('Основное изображение', default=False)
+    variants = models.JSONField(
+        'Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Уменьшенные копии в форматах WebP и JPEG'
+    )
+    processing_status = models.CharField(
+        'Статус обработки',
+        max_length=20,
+        choices=PROCESSING_STATUS_CHOICES,
+        default='pending',
+        editable=False
+    )
     uploaded_at = models.DateTimeField('Дата загрузки', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
 
     class Meta:
         verbose_name = 'Изображение билборда'
         verbose_name_plural = 'Изображения билбордов'
         ordering = ['order', '-uploaded_at']
+        indexes = [
+            # Лента изменений для синхронизации клиентов
+            models.Index(fields=['updated_at', 'id'], name='image_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"Изображение для {self.billboard.title}"
@@ -251,5 +374,237 @@ class BillboardImage(models.Model):
             BillboardImage.objects.filter(
                 billboard=self.billboard, 
                 is_primary=True
-            ).exclude(pk=self.pk).update(is_primary=False)
+            ).exclude(pk=self.pk).update(is_primary=False, updated_at=timezone.now())
+        # Новый файл ещё не сохранён в хранилище — ставим его в очередь обработки
+        image_uploaded = bool(self.image) and not getattr(self.image, '_committed', True)
+        if image_uploaded:
+            self.processing_status = 'pending'
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'processing_status'}
         super().save(*args, **kwargs)
+        if image_uploaded:
+            ImageJob.enqueue(self)
+
+
+class ImageJob(models.Model):
+    """Задача фоновой обработки изображения (очередь в базе данных)"""
+
+    STATUS_CHOICES = [
+        ('queued', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+
+    image = models.ForeignKey(
+        BillboardImage,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        verbose_name='Изображение'
+    )
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток', default=3)
+    run_after = models.DateTimeField('Запустить после', default=timezone.now)
+    locked_at = models.DateTimeField('Взята в работу', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Задача обработки изображения'
+        verbose_name_plural = 'Задачи обработки изображений'
+        ordering = ['run_after', 'id']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"Задача #{self.id} ({self.get_status_display()})"
+
+    @classmethod
+    def enqueue(cls, image):
+        """Ставит изображение в очередь, если для него нет ожидающей задачи"""
+        job = cls.objects.filter(image=image, status='queued').first()
+        if job is None:
+            job = cls.objects.create(image=image)
+        return job
+
+
+class BillboardStatusChange(models.Model):
+    """История смены статусов билборда"""
+
+    SOURCE_CHOICES = [
+        ('expiry', 'Истечение срока аренды'),
+        ('manual', 'Изменение вручную'),
+    ]
+
+    billboard = models.ForeignKey(
+        Billboard,
+        on_delete=models.CASCADE,
+        related_name='status_changes',
+        verbose_name='Билборд'
+    )
+    old_status = models.CharField('Прежний статус', max_length=20, choices=Billboard.STATUS_CHOICES)
+    new_status = models.CharField('Новый статус', max_length=20, choices=Billboard.STATUS_CHOICES)
+    source = models.CharField('Источник', max_length=20, choices=SOURCE_CHOICES, default='manual')
+    changed_at = models.DateTimeField('Дата изменения', default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = 'Смена статуса'
+        verbose_name_plural = 'Смены статусов'
+        ordering = ['-changed_at', '-id']
+
+    def __str__(self):
+        return f"{self.billboard_id}: {self.old_status} → {self.new_status}"
+
+
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        """Бронирования, занимающие билборд (без отменённых)"""
+        return self.exclude(status='cancelled')
+
+    def overlapping(self, start, end):
+        """Бронирования, пересекающиеся с периодом [start, end] (границы включительно)"""
+        return self.filter(start_date__lte=end, end_date__gte=start)
+
+
+class Booking(models.Model):
+    """Бронирование билборда на период аренды"""
+
+    STATUS_CHOICES = [
+        ('tentative', 'Предварительное'),
+        ('confirmed', 'Подтверждено'),
+        ('cancelled', 'Отменено'),
+    ]
+
+    billboard = models.ForeignKey(
+        Billboard,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name='Билборд'
+    )
+    contractor = models.ForeignKey(
+        Contractor,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        verbose_name='Контрагент',
+        blank=True,
+        null=True,
+    )
+    start_date = models.DateField('Дата начала')
+    end_date = models.DateField('Дата окончания')
+    price = models.DecimalField(
+        'Стоимость (сум)',
+        max_digits=12,
+        decimal_places=2,
+        blank=True,
+        null=True
+    )
+    status = models.CharField('Статус', max_length=20, choices=STATUS_CHOICES, default='confirmed')
+    notes = models.TextField('Заметки', blank=True)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата обновления', auto_now=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Бронирование'
+        verbose_name_plural = 'Бронирования'
+        ordering = ['start_date', 'id']
+        indexes = [
+            # Пересечения для одного билборда и поиск свободных билбордов
+            # (billboard = ? AND start_date <= ?); статус в индексе, чтобы
+            # не читать строки таблицы
+            models.Index(
+                fields=['billboard', 'start_date', 'end_date', 'status'],
+                name='booking_billboard_period_idx',
+            ),
+            # Бронирования всех билбордов за период: диапазон end_date >= ?
+            models.Index(fields=['end_date', 'start_date'], name='booking_period_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(end_date__gte=models.F('start_date')),
+                name='booking_period_valid',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.billboard_id}: {self.start_date} – {self.end_date}"
+
+    def clean(self):
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValidationError({'end_date': 'Дата окончания раньше даты начала.'})
+        if self.status == 'cancelled' or self.billboard_id is None:
+            return
+        conflict = (
+            Booking.objects.active()
+            .overlapping(self.start_date, self.end_date)
+            .filter(billboard_id=self.billboard_id)
+            .exclude(pk=self.pk)
+            .first()
+        )
+        if conflict is not None:
+            raise ValidationError(
+                'Билборд уже забронирован на '
+                f'{conflict.start_date:%d.%m.%Y} – {conflict.end_date:%d.%m.%Y}.'
+            )
+
+
+class SyncTombstone(models.Model):
+    """Запись об удалённом объекте для ленты синхронизации клиентов"""
+
+    model = models.CharField('Модель', max_length=100)
+    object_id = models.BigIntegerField('ID объекта')
+    deleted_at = models.DateTimeField('Дата удаления', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Удалённый объект'
+        verbose_name_plural = 'Удалённые объекты'
+        ordering = ['deleted_at', 'id']
+        indexes = [models.Index(fields=['deleted_at', 'id'])]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+
+class BillboardRollup(models.Model):
+    """
+    Занятость и выручка за день или месяц в разрезе категории, контрагента
+    и сотрудника. Обновляется инкрементально при изменении билбордов,
+    полностью пересчитывается командой rebuild_rollups.
+    """
+
+    PERIOD_CHOICES = [
+        ('day', 'День'),
+        ('month', 'Месяц'),
+    ]
+    DIMENSION_CHOICES = [
+        ('total', 'Всего'),
+        ('category', 'Категория'),
+        ('contractor', 'Контрагент'),
+        ('employee', 'Сотрудник'),
+    ]
+
+    period = models.CharField('Период', max_length=10, choices=PERIOD_CHOICES)
+    date = models.DateField('Начало периода')
+    dimension = models.CharField('Разрез', max_length=20, choices=DIMENSION_CHOICES)
+    # id категории, контрагента или сотрудника; 0 — итог или значение не задано
+    key = models.BigIntegerField('Ключ', default=0)
+    billboards = models.IntegerField('Занятых билбордов', default=0)
+    billboard_days = models.IntegerField('Билбордо-дней', default=0)
+    revenue = models.DecimalField('Выручка (сум)', max_digits=18, decimal_places=4, default=0)
+
+    class Meta:
+        verbose_name = 'Сводка занятости'
+        verbose_name_plural = 'Сводки занятости'
+        ordering = ['dimension', 'period', 'date', 'key']
+        constraints = [
+            # Также индекс для выборки ряда: разрез, период, диапазон дат
+            models.UniqueConstraint(
+                fields=['dimension', 'period', 'date', 'key'],
+                name='rollup_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} {self.period} {self.date}"
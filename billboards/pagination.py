@@ -0,0 +1,121 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная пагинация по ключу (created_at, id).
+    Страница выбирается условием по индексу вместо OFFSET и не требует COUNT(*),
+    поэтому тысячная страница стоит столько же, сколько первая.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def encode_cursor(self, instance, reverse):
+        value = f"{'p' if reverse else 'n'}|{instance.created_at.isoformat()}|{instance.pk}"
+        return b64encode(value.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            direction, created_at, pk = b64decode(encoded.encode()).decode().split("|")
+            return direction == "p", datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+
+        reverse = bool(cursor and cursor[0])
+        if cursor:
+            _, created_at, pk = cursor
+            # created_at <= X AND (created_at < X OR id < Y): диапазон по ведущему
+            # столбцу индекса (created_at, id) с уточнением по id
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gte=created_at)
+                    & (Q(created_at__gt=created_at) | Q(pk__gt=pk))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lte=created_at)
+                    & (Q(created_at__lt=created_at) | Q(pk__lt=pk))
+                )
+        ordering = ("created_at", "pk") if reverse else ("-created_at", "-pk")
+
+        rows = list(queryset.order_by(*ordering)[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next = cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1], reverse=False),
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[0], reverse=True),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по умолчанию; ?cursor= или ?pagination=cursor
+    включает курсорный режим KeysetPagination
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (
+            KeysetPagination.cursor_query_param in request.query_params
+            or request.query_params.get("pagination") == "cursor"
+        ):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
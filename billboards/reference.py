@@ -0,0 +1,92 @@
+import logging
+
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db import DatabaseError
+
+from .caching import bump_version, get_versions
+from .models import Category, Contractor, Employee
+
+logger = logging.getLogger("billboards")
+
+# Справочники, которые вкладываются в ответы API билбордов
+REFERENCE_MODELS = (Category, Contractor, Employee)
+# Время хранения сериализованных справочников в общем кэше (секунды)
+SHARED_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Справочники процесса: модель -> (версия, {pk: данные})
+_local = {}
+
+
+def _shared_key(model, version):
+    return f"billboards:reference:{model._meta.label_lower}:{version}"
+
+
+def _serialize(model):
+    """Все строки справочника через сериализатор API: {pk: данные}"""
+    from .serializers import CategorySerializer, ContractorSerializer, EmployeeSerializer
+
+    serializer_class = {
+        Category: CategorySerializer,
+        Contractor: ContractorSerializer,
+        Employee: EmployeeSerializer,
+    }[model]
+    objects = list(model.objects.order_by())
+    for obj in objects:
+        # Количество билбордов зависит от билбордов, а не от справочника:
+        # его подставляет ReferenceField
+        obj.num_billboards = None
+    data = serializer_class(objects, many=True).data
+    return {obj.pk: dict(item) for obj, item in zip(objects, data)}
+
+
+def load(*models, refresh=False):
+    """
+    Сериализованные справочники {модель: {pk: данные}}.
+
+    Данные хранятся в памяти процесса вместе с версией таблицы из общего
+    кэша (её сдвигают сигналы при изменении справочника). Пока версия
+    не изменилась, запросов к базе нет; после изменения данные берутся
+    из общего кэша (их уже построил другой воркер) или строятся заново.
+    Версию видят все воркеры, только если кэш общий (см. проверку
+    billboards.W001): с LocMemCache изменение в одном процессе другие
+    не заметят.
+    """
+    versions = get_versions(*models)
+    missing = [model for model, version in versions.items() if version is None]
+    if missing:
+        # Версия вытеснена из кэша: задаём новую, чтобы не принять за
+        # актуальные данные, загруженные до изменения
+        bump_version(*missing)
+        versions.update(get_versions(*missing))
+
+    result = {}
+    for model in models:
+        version = versions[model]
+        entry = _local.get(model)
+        if refresh or entry is None or entry[0] != version:
+            key = _shared_key(model, version)
+            payloads = None if refresh else cache.get(key)
+            if payloads is None:
+                payloads = _serialize(model)
+                cache.set(key, payloads, SHARED_CACHE_TIMEOUT)
+            entry = _local[model] = (version, payloads)
+        result[model] = entry[1]
+    return result
+
+
+def warm():
+    """Загружает все справочники заранее, возвращает количество строк каждого"""
+    return {model: len(payloads) for model, payloads in load(*REFERENCE_MODELS).items()}
+
+
+def warm_on_first_request(sender, **kwargs):
+    """
+    Прогрев справочников воркера перед первым запросом (подключается
+    в BillboardsConfig.ready, где обращаться к базе ещё нельзя)
+    """
+    request_started.disconnect(warm_on_first_request)
+    try:
+        warm()
+    except DatabaseError:
+        logger.warning("Не удалось прогреть кэш справочников", exc_info=True)
@@ -0,0 +1,25 @@
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import msgpack
+except ImportError:  # необязательная зависимость
+    msgpack = None
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Ответ в MessagePack (Accept: application/msgpack или ?format=msgpack)"""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, use_bin_type=True)
+
+
+def optional_renderers():
+    """Дополнительные рендереры, доступные при установленных зависимостях"""
+    return [MessagePackRenderer] if msgpack is not None else []
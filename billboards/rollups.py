@@ -0,0 +1,385 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.db import connection, transaction
+
+from .models import Billboard, BillboardRollup, Category, Contractor, Employee
+
+# Статусы, при которых билборд считается занятым в период аренды
+OCCUPYING_STATUSES = ("active", "expired")
+
+DIMENSIONS = ("total", "category", "contractor", "employee")
+MEASURES = ("billboards", "billboard_days", "revenue")
+
+# Поля билборда, от которых зависят сводки
+SNAPSHOT_FIELDS = (
+    "status",
+    "start_date",
+    "end_date",
+    "price",
+    "category_id",
+    "contractor_id",
+    "employee_id",
+)
+
+RATE_PRECISION = Decimal("0.0001")
+BATCH_SIZE = 1000
+# Максимум дней аренды в одном upsert сводок (строк, которые он разворачивает)
+BATCH_DAYS = 50000
+
+
+def snapshot(billboard):
+    """Значения полей билборда, влияющих на сводки"""
+    return tuple(getattr(billboard, name) for name in SNAPSHOT_FIELDS)
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def daily_rate(price, start, end):
+    """Выручка за день: стоимость аренды, равномерно распределённая по дням"""
+    if not price:
+        return Decimal(0)
+    return (Decimal(price) / ((end - start).days + 1)).quantize(RATE_PRECISION)
+
+
+def _keys(values):
+    status, start, end, price, category, contractor, employee = values
+    return (
+        ("total", 0),
+        ("category", category or 0),
+        ("contractor", contractor or 0),
+        ("employee", employee or 0),
+    )
+
+
+def _occupies(values):
+    status, start, end = values[:3]
+    return status in OCCUPYING_STATUSES and start is not None and end is not None and start <= end
+
+
+def _change_row(values):
+    """
+    Параметры билборда для SQL сводок: (первый день, дней аренды − 1,
+    выручка за день, категория, контрагент, сотрудник) или None, если
+    билборд не занимает период
+    """
+    if values is None or not _occupies(values):
+        return None
+    status, start, end, price = values[:4]
+    keys = tuple(key for _, key in _keys(values)[1:])
+    return (start, (end - start).days, daily_rate(price, start, end), *keys)
+
+
+# Выражения дат по СУБД: (дата + дни, начало месяца)
+DATE_SQL = {
+    "sqlite": ("date({date}, '+' || {days} || ' days')", "date({date}, 'start of month')"),
+    "postgresql": ("({date} + {days})", "CAST(date_trunc('month', {date}) AS date)"),
+}
+# Столбец ключа разреза в CTE changes (итог — без ключа)
+DIMENSION_COLUMNS = {
+    "total": None,
+    "category": "category",
+    "contractor": "contractor",
+    "employee": "employee",
+}
+# Параметров на одно изменение: знак и поля _change_row
+CHANGE_PARAMS = 7
+
+
+def _apply_sql(count):
+    """
+    Один INSERT ... SELECT ... ON CONFLICT на count изменений: дни аренды
+    разворачиваются рекурсивным CTE, приращения группируются по разрезу,
+    ключу и дню или месяцу и прибавляются к существующим строкам
+    (PostgreSQL и SQLite 3.24+)
+    """
+    add_days, month_start_sql = DATE_SQL[connection.vendor]
+    meta = BillboardRollup._meta
+    quote = connection.ops.quote_name
+    columns = [
+        meta.get_field(name).column
+        for name in ("dimension", "key", "period", "date") + MEASURES
+    ]
+    row_sql = "(" + ", ".join(["%s"] * CHANGE_PARAMS) + ")"
+
+    measures = (
+        "SUM(sign) AS billboard_days, ROUND(SUM(sign * rate), 4) AS revenue FROM days"
+    )
+    selects = []
+    for dimension, column in DIMENSION_COLUMNS.items():
+        key = column or "0"
+        group = f"{column}, " if column else ""
+        selects.append(
+            f"SELECT '{dimension}' AS dimension, {key} AS row_key, 'day' AS period, "
+            f"on_date AS row_date, SUM(sign) AS billboards, {measures} "
+            f"GROUP BY {group}on_date"
+        )
+        # В месячной строке билборд учитывается один раз: в первый день
+        # аренды или первое число месяца
+        selects.append(
+            f"SELECT '{dimension}', {key}, 'month', month, "
+            f"SUM(CASE WHEN n = 0 OR on_date = month THEN sign ELSE 0 END), {measures} "
+            f"GROUP BY {group}month"
+        )
+    updates = ", ".join(
+        f"{quote(column)} = {quote(meta.db_table)}.{quote(column)} + EXCLUDED.{quote(column)}"
+        for column in columns[4:]
+    )
+    on_date = add_days.format(date="c.first_day", days="o.n")
+    return (
+        "WITH RECURSIVE "
+        "offsets(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM offsets WHERE n < %s), "
+        "changes(sign, first_day, span, rate, category, contractor, employee) AS "
+        f"(VALUES {', '.join([row_sql] * count)}), "
+        "days AS ("
+        "SELECT c.sign, c.rate, c.category, c.contractor, c.employee, o.n, "
+        f"{on_date} AS on_date, {month_start_sql.format(date=on_date)} AS month "
+        "FROM changes c JOIN offsets o ON o.n <= c.span) "
+        f"INSERT INTO {quote(meta.db_table)} ({', '.join(map(quote, columns))}) "
+        f"SELECT * FROM ({' UNION ALL '.join(selects)}) deltas "
+        # WHERE также снимает неоднозначность разбора ON CONFLICT в SQLite
+        "WHERE billboards <> 0 OR billboard_days <> 0 OR revenue <> 0 "
+        f"ON CONFLICT ({', '.join(map(quote, columns[:4]))}) DO UPDATE SET {updates}"
+    )
+
+
+def _change_rows(changes):
+    """Строки CTE changes: (знак, *_change_row) для изменившихся билбордов"""
+    rows = []
+    for old, new in changes:
+        old, new = _change_row(old), _change_row(new)
+        if old == new:
+            continue
+        rows.extend((sign, *row) for sign, row in ((-1, old), (1, new)) if row)
+    return sorted(rows)
+
+
+def _batches(rows):
+    """
+    Пачки изменений для одного upsert: не больше параметров, чем допускает
+    СУБД, и не больше BATCH_DAYS дней аренды, чтобы запрос был коротким
+    """
+    max_params = connection.features.max_query_params
+    max_rows = (max_params - 1) // CHANGE_PARAMS if max_params else None
+    batch, days = [], 0
+    for row in rows:
+        if batch and (days + row[2] + 1 > BATCH_DAYS or len(batch) == max_rows):
+            yield batch
+            batch, days = [], 0
+        batch.append(row)
+        days += row[2] + 1
+    if batch:
+        yield batch
+
+
+def _apply_batch(batch):
+    date_field = BillboardRollup._meta.get_field("date")
+    revenue_field = BillboardRollup._meta.get_field("revenue")
+    params = [max(row[2] for row in batch)]
+    for sign, start, span, rate, *keys in batch:
+        params += [
+            sign,
+            date_field.get_db_prep_save(start, connection),
+            span,
+            revenue_field.get_db_prep_save(rate, connection),
+            *keys,
+        ]
+    with connection.cursor() as cursor:
+        cursor.execute(_apply_sql(len(batch)), params)
+    # Строки, обнулённые вычитанием, не хранятся. Обнулиться могут только
+    # строки с вычитаемым вкладом
+    removed = [row for row in batch if row[0] < 0]
+    if removed:
+        BillboardRollup.objects.filter(
+            dimension__in=DIMENSIONS,
+            period__in=[period for period, _ in BillboardRollup.PERIOD_CHOICES],
+            date__range=(
+                month_start(min(row[1] for row in removed)),
+                max(row[1] + timedelta(days=row[2]) for row in removed),
+            ),
+            billboards=0,
+            billboard_days=0,
+            revenue=0,
+        ).delete()
+
+
+def _apply_deferred(batches):
+    # Каждая пачка в своей транзакции: блокировка записи освобождается
+    # между пачками, и другие запросы не ждут всю массовую операцию
+    for batch in batches:
+        with transaction.atomic():
+            _apply_batch(batch)
+
+
+def apply_changes(changes, deferred=False):
+    """
+    Инкрементальное обновление сводок. changes — пары (прежние значения,
+    новые значения) из snapshot(); None — билборд создан или удалён.
+    Приращения считаются в базе: один upsert на пачку изменений по всем
+    разрезам, дням и месяцам (см. _apply_sql). Параллельные транзакции,
+    впервые затрагивающие одну строку, не конфликтуют по rollup_unique,
+    а складываются.
+
+    deferred=True — для массовых операций: сводки обновляются после COMMIT
+    транзакции вызывающего, пачками в отдельных транзакциях. Приращения
+    перестановочны, поэтому порядок относительно других записей не важен;
+    если процесс упадёт до обновления, сводки восстановит rebuild_rollups.
+    """
+    batches = list(_batches(_change_rows(changes)))
+    if not batches:
+        return
+    if deferred:
+        transaction.on_commit(partial(_apply_deferred, batches))
+        return
+    with transaction.atomic():
+        for batch in batches:
+            _apply_batch(batch)
+
+
+def rebuild_rollups():
+    """
+    Полный пересчёт сводок по таблице билбордов. Дневные ряды строятся
+    разностными массивами (+1 в начале аренды, −1 после окончания),
+    поэтому время не зависит от длины аренд. Возвращает количество строк.
+    """
+    # (разрез, ключ) -> дата -> [изменение числа билбордов, изменение выручки в день]
+    day_events = defaultdict(lambda: defaultdict(lambda: [0, Decimal(0)]))
+    months = defaultdict(lambda: [0, 0, Decimal(0)])
+
+    rows = Billboard.objects.filter(status__in=OCCUPYING_STATUSES).order_by().values_list(
+        *SNAPSHOT_FIELDS
+    )
+    for values in rows.iterator(chunk_size=2000):
+        if not _occupies(values):
+            continue
+        status, start, end, price = values[:4]
+        rate = daily_rate(price, start, end)
+        keys = _keys(values)
+        for dimension_key in keys:
+            events = day_events[dimension_key]
+            events[start][0] += 1
+            events[start][1] += rate
+            events[end + timedelta(days=1)][0] -= 1
+            events[end + timedelta(days=1)][1] -= rate
+
+        month = month_start(start)
+        while month <= end:
+            days = (min(end, next_month(month) - timedelta(days=1)) - max(start, month)).days + 1
+            for dimension, key in keys:
+                total = months[(dimension, key, month)]
+                total[0] += 1
+                total[1] += days
+                total[2] += rate * days
+            month = next_month(month)
+
+    def generate():
+        for (dimension, key), events in day_events.items():
+            count, rate = 0, Decimal(0)
+            dates = sorted(events)
+            for current, following in zip(dates, dates[1:] + [None]):
+                count += events[current][0]
+                rate += events[current][1]
+                if not count:
+                    continue
+                day = current
+                while day != following:
+                    yield BillboardRollup(
+                        dimension=dimension,
+                        key=key,
+                        period="day",
+                        date=day,
+                        billboards=count,
+                        billboard_days=count,
+                        revenue=rate,
+                    )
+                    day += timedelta(days=1)
+        for (dimension, key, month), (billboards, days, revenue) in months.items():
+            yield BillboardRollup(
+                dimension=dimension,
+                key=key,
+                period="month",
+                date=month,
+                billboards=billboards,
+                billboard_days=days,
+                revenue=revenue,
+            )
+
+    created = 0
+    with transaction.atomic():
+        BillboardRollup.objects.all().delete()
+        batch = []
+        for row in generate():
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                BillboardRollup.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            BillboardRollup.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+# Максимум точек ряда в одном запросе аналитики
+MAX_POINTS = {"day": 366, "month": 120}
+DIMENSION_MODELS = {
+    "category": Category,
+    "contractor": Contractor,
+    "employee": Employee,
+}
+
+
+def default_range(period, today):
+    """Последние 30 дней или 12 месяцев, включая текущий"""
+    if period == "day":
+        return today - timedelta(days=29), today
+    start = month_start(today)
+    for _ in range(11):
+        start = month_start(start - timedelta(days=1))
+    return start, today
+
+
+def rollup_series(period, dimension, start, end, key=None):
+    """
+    Временные ряды из сводок: по одному ряду на ключ разреза.
+    Читает только строки сводок, поэтому время не зависит от числа билбордов.
+    """
+    if period == "month":
+        start = month_start(start)
+    rows = BillboardRollup.objects.filter(
+        dimension=dimension, period=period, date__range=(start, end)
+    )
+    if key is not None:
+        rows = rows.filter(key=key)
+
+    series = {}
+    for row_key, day, billboards, days, revenue in rows.order_by("key", "date").values_list(
+        "key", "date", *MEASURES
+    ):
+        series.setdefault(row_key, []).append(
+            {
+                "date": day,
+                "billboards": billboards,
+                "billboard_days": days,
+                "revenue": revenue.quantize(Decimal("0.01")),
+            }
+        )
+
+    names = {0: "Всего" if dimension == "total" else "Не указано"}
+    if dimension in DIMENSION_MODELS:
+        names.update(
+            (obj.pk, str(obj))
+            for obj in DIMENSION_MODELS[dimension].objects.filter(pk__in=list(series))
+        )
+    return [
+        {"key": row_key, "name": names.get(row_key, str(row_key)), "points": points}
+        for row_key, points in series.items()
+    ]
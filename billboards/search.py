@@ -0,0 +1,185 @@
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Billboard, Category, Contractor, Employee
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold_yo(sql):
+    # unicode61 не считает «ё» вариантом «е», поэтому приводим её явно
+    return f"REPLACE(REPLACE({sql}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+class SearchBackend(ABC):
+    """
+    Интерфейс поискового индекса билбордов.
+    Индекс охватывает название, адрес, ФИО сотрудника, категорию и контрагента.
+    Наследник обязан реализовать filter_queryset, остальные методы
+    по умолчанию ничего не делают.
+    """
+
+    @abstractmethod
+    def filter_queryset(self, queryset, query):
+        """Оставляет билборды, подходящие под запрос"""
+
+    def rank_queryset(self, queryset, query):
+        """Сортирует отфильтрованные билборды по релевантности"""
+        return queryset
+
+    def index(self, billboard_ids):
+        """Обновляет записи индекса для билбордов"""
+
+    def remove(self, billboard_ids):
+        """Удаляет билборды из индекса"""
+
+    def rebuild(self):
+        """Полностью перестраивает индекс"""
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск подстрокой (icontains) без отдельного индекса"""
+
+    def filter_queryset(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(address__icontains=query)
+            | Q(employee__first_name__icontains=query)
+            | Q(employee__last_name__icontains=query)
+            | Q(category__name__icontains=query)
+            | Q(contractor__name__icontains=query)
+            | Q(contractor__contact_person__icontains=query)
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    Полнотекстовый индекс на виртуальной таблице SQLite FTS5.
+    Токенизатор unicode61 приводит кириллицу и латиницу к нижнему регистру
+    и убирает диакритику, каждое слово запроса ищется как префикс.
+    """
+
+    table = "billboards_billboard_search"
+    chunk_size = 500
+    fallback = LikeSearchBackend()
+
+    def ensure_table(self):
+        """Создаёт таблицу индекса; возвращает True, если её ещё не было"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                [self.table],
+            )
+            if cursor.fetchone():
+                return False
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+                "title, address, employee, category, contractor, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+        return True
+
+    def match_expression(self, query):
+        words = WORD_RE.findall(query.replace("ё", "е").replace("Ё", "Е"))
+        return " ".join(f'"{word}"*' for word in words)
+
+    def filter_queryset(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return self.fallback.filter_queryset(queryset, query)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [match]
+            )
+        )
+
+    def rank_queryset(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset
+        billboard_table = Billboard._meta.db_table
+        # MATCH выполняется один раз: подзапрос с LIMIT -1 SQLite не
+        # встраивает во внешний, а материализует и переиспользует для всех
+        # строк. Без этого полнотекстовый поиск повторялся бы на каждой строке.
+        return queryset.annotate(
+            search_rank=RawSQL(
+                "SELECT ranked.rank FROM ("
+                f"SELECT rowid AS id, bm25({self.table}, 10.0, 5.0, 2.0, 2.0, 2.0) "
+                f"AS rank FROM {self.table} WHERE {self.table} MATCH %s LIMIT -1"
+                f') ranked WHERE ranked.id = "{billboard_table}"."id"',
+                [match],
+            )
+        ).order_by("search_rank", "-created_at")
+
+    def _insert_sql(self, where=""):
+        columns = ", ".join(
+            _fold_yo(column)
+            for column in (
+                "b.title",
+                "b.address",
+                "e.first_name || ' ' || e.last_name",
+                "COALESCE(c.name, '')",
+                "COALESCE(k.name || ' ' || k.contact_person || ' ' || k.inn, '')",
+            )
+        )
+        return (
+            f"INSERT INTO {self.table} "
+            "(rowid, title, address, employee, category, contractor) "
+            f"SELECT b.id, {columns} "
+            f"FROM {Billboard._meta.db_table} b "
+            f"JOIN {Employee._meta.db_table} e ON e.id = b.employee_id "
+            f"LEFT JOIN {Category._meta.db_table} c ON c.id = b.category_id "
+            f"LEFT JOIN {Contractor._meta.db_table} k ON k.id = b.contractor_id "
+            f"{where}"
+        )
+
+    def _chunks(self, billboard_ids):
+        billboard_ids = list(billboard_ids)
+        for start in range(0, len(billboard_ids), self.chunk_size):
+            chunk = billboard_ids[start : start + self.chunk_size]
+            yield chunk, ", ".join(["%s"] * len(chunk))
+
+    def index(self, billboard_ids):
+        with connection.cursor() as cursor:
+            for chunk, placeholders in self._chunks(billboard_ids):
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk
+                )
+                cursor.execute(
+                    self._insert_sql(f"WHERE b.id IN ({placeholders})"), chunk
+                )
+
+    def remove(self, billboard_ids):
+        with connection.cursor() as cursor:
+            for chunk, placeholders in self._chunks(billboard_ids):
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", chunk
+                )
+
+    def rebuild(self):
+        self.ensure_table()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(self._insert_sql())
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """
+    Поисковый бэкенд из настройки BILLBOARDS_SEARCH_BACKEND.
+    По умолчанию FTS5 для SQLite и поиск подстрокой для остальных баз.
+    """
+    path = getattr(settings, "BILLBOARDS_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    if connection.vendor == "sqlite":
+        return SQLiteFTS5Backend()
+    return LikeSearchBackend()
@@ -1,8 +1,94 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, QuerySet
 from rest_framework import serializers
-from .models import Billboard, BillboardImage, Employee, Category, Contractor
+from . import reference
+from .images import variant_urls
+from .models import Billboard, BillboardImage, Booking, Employee, Category, Contractor
 
 
-class CategorySerializer(serializers.ModelSerializer):
+def _url_builder(context):
+    request = context.get("request")
+    return request.build_absolute_uri if request else None
+
+
+def _query_list(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Поддержка ?fields=a,b и ?expand=nested для сериализатора верхнего уровня.
+    fields оставляет только перечисленные поля (плюс поля из expand),
+    expand оставляет только перечисленные вложенные сериализаторы.
+    Meta.sparse_sources описывает, от каких полей модели зависят вычисляемые поля.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is None:
+            return
+        requested = _query_list(request, "fields")
+        expand = _query_list(request, "expand")
+        if requested is None and expand is None:
+            return
+
+        for name, field in list(self.fields.items()):
+            nested = isinstance(field, serializers.BaseSerializer) or (
+                isinstance(field, ReferenceField) and field.key is None
+            )
+            if expand is not None and nested and name not in expand:
+                self.fields.pop(name)
+            elif requested is not None and name not in requested | (expand or set()):
+                self.fields.pop(name)
+
+    def restrict_queryset(self, queryset):
+        """Ограничивает выборку столбцами и связями, нужными оставшимся полям"""
+        model = self.Meta.model
+        sources = getattr(self.Meta, "sparse_sources", {})
+        only = {model._meta.pk.name}
+        related = set()
+        prefetch = set()
+
+        for name, field in self.fields.items():
+            if name in sources:
+                paths = sources[name]
+            elif field.source == "*":
+                paths = []
+            else:
+                paths = [field.source_attrs[0]]
+
+            for path in paths:
+                if "__" in path:
+                    only.add(path)
+                    related.add(path.split("__")[0])
+                    continue
+                try:
+                    model_field = model._meta.get_field(path)
+                except FieldDoesNotExist:
+                    continue
+                if model_field.one_to_many or model_field.many_to_many:
+                    prefetch.add(path)
+                elif model_field.concrete:
+                    only.add(path)
+                    if model_field.many_to_one and len(field.source_attrs) > 1:
+                        related.add(path)
+                    elif isinstance(field, serializers.BaseSerializer):
+                        related.add(path)
+
+        only.update(related)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*only)
+
+
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     billboards_count = serializers.ReadOnlyField()
 
     class Meta:
@@ -18,9 +104,10 @@ class CategorySerializer(serializers.ModelSerializer):
             "order",
             "billboards_count",
         ]
+        sparse_sources = {"billboards_count": []}
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
 
     class Meta:
@@ -34,9 +121,17 @@ class EmployeeSerializer(serializers.ModelSerializer):
             "phone",
             "position",
         ]
+        sparse_sources = {"full_name": ["first_name", "last_name"]}
 
 
-class ContractorSerializer(serializers.ModelSerializer):
+class EmployeeSyncSerializer(EmployeeSerializer):
+    """Сотрудник в ленте синхронизации: уволенные тоже отдаются, с is_active"""
+
+    class Meta(EmployeeSerializer.Meta):
+        fields = EmployeeSerializer.Meta.fields + ["is_active", "updated_at"]
+
+
+class ContractorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     billboards_count = serializers.ReadOnlyField()
     display_contact = serializers.ReadOnlyField()
 
@@ -59,23 +154,122 @@ class ContractorSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        sparse_sources = {
+            "billboards_count": [],
+            "display_contact": ["contact_person", "phone"],
+        }
 
 
 class BillboardImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = BillboardImage
-        fields = ["id", "image", "alt_text", "order", "is_primary"]
+        fields = [
+            "id",
+            "image",
+            "alt_text",
+            "order",
+            "is_primary",
+            "processing_status",
+            "variants",
+        ]
+
+    def get_variants(self, obj):
+        return variant_urls(obj, _url_builder(self.context))
+
+
+class BillboardImageSyncSerializer(BillboardImageSerializer):
+    """Изображение в ленте синхронизации: с билбордом и временем изменения"""
+
+    class Meta(BillboardImageSerializer.Meta):
+        fields = BillboardImageSerializer.Meta.fields + ["billboard", "updated_at"]
+
+
+class ReferenceField(serializers.ReadOnlyField):
+    """
+    Данные справочника (категория, контрагент, сотрудник) по внешнему ключу
+    строки из кэша справочников billboards.reference — без JOIN и без
+    вложенного сериализатора на каждую строку. Количество билбордов
+    считается одним запросом для всех строк страницы.
+    key — отдать одно значение из данных справочника (например, full_name).
+    """
+
+    def __init__(self, relation, key=None, **kwargs):
+        self.relation = relation
+        self.key = key
+        kwargs.setdefault("source", f"{relation}_id")
+        super().__init__(**kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.model = parent.Meta.model._meta.get_field(self.relation).related_model
+
+    def _payloads(self, refresh=False):
+        # Справочники загружаются один раз на запрос (контекст сериализатора)
+        # одной проверкой версий для всех справочников
+        loaded = self.context.setdefault("reference_data", {})
+        if refresh:
+            loaded.update(reference.load(self.model, refresh=True))
+        elif self.model not in loaded:
+            loaded.update(reference.load(*reference.REFERENCE_MODELS))
+        return loaded[self.model]
+
+    def _count(self, pk):
+        counts = self.context.setdefault("reference_counts", {})
+        if (self.model, pk) not in counts:
+            # Подсчёт после пагинации: в основном запросе подзапросы COUNT
+            # вычислялись бы для всех строк выборки до сортировки
+            instances = self.root.instance
+            if not isinstance(instances, (list, tuple, QuerySet)):
+                instances = [instances]
+            ids = {getattr(obj, self.source, None) for obj in instances} | {pk}
+            ids.discard(None)
+            rows = (
+                Billboard.objects.filter(**{f"{self.relation}__in": ids})
+                .order_by()
+                .values_list(self.relation)
+                .annotate(count=Count("id"))
+            )
+            found = dict(rows)
+            for related_id in ids:
+                counts[(self.model, related_id)] = found.get(related_id, 0)
+        return counts[(self.model, pk)]
+
+    def to_representation(self, pk):
+        data = self._payloads().get(pk)
+        if data is None:
+            # Строка добавлена после загрузки справочника
+            data = self._payloads(refresh=True)[pk]
+        if self.key is not None:
+            return data[self.key]
+        if "billboards_count" in data:
+            data = {**data, "billboards_count": self._count(pk)}
+        return data
+
 
+class DistanceMixin:
+    """Расстояние до точки near (км), если выборка аннотирована distance"""
 
-class BillboardSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        distance = getattr(instance, "distance", None)
+        if distance is not None:
+            data["distance"] = round(distance, 3)
+        return data
+
+
+class BillboardSerializer(
+    DistanceMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     images = BillboardImageSerializer(many=True, read_only=True)
-    employee_name = serializers.CharField(source="employee.full_name", read_only=True)
-    contractor_data = ContractorSerializer(source="contractor", read_only=True)
+    employee_name = ReferenceField("employee", key="full_name")
+    contractor_data = ReferenceField("contractor")
     size = serializers.CharField(source="size_display", read_only=True)
     period = serializers.CharField(source="period_display", read_only=True)
     location = serializers.SerializerMethodField()
     days_until_expiry = serializers.ReadOnlyField()
-    category_data = CategorySerializer(source="category", read_only=True)
+    category_data = ReferenceField("category")
 
     class Meta:
         model = Billboard
@@ -107,21 +301,30 @@ class BillboardSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        sparse_sources = {
+            "size": ["width", "height"],
+            "period": ["start_date", "end_date"],
+            "location": ["latitude", "longitude"],
+            "days_until_expiry": ["end_date"],
+        }
 
     def get_location(self, obj):
         return {"lat": float(obj.latitude), "lng": float(obj.longitude)}
 
 
-class BillboardListSerializer(serializers.ModelSerializer):
+class BillboardListSerializer(
+    DistanceMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """Упрощенный сериализатор для списка билбордов"""
 
     images = serializers.SerializerMethodField()
-    employee = serializers.CharField(source="employee.full_name", read_only=True)
-    contractor_data = ContractorSerializer(source="contractor", read_only=True)
+    image_sets = serializers.SerializerMethodField()
+    employee = ReferenceField("employee", key="full_name")
+    contractor_data = ReferenceField("contractor")
     size = serializers.CharField(source="size_display", read_only=True)
     period = serializers.CharField(source="period_display", read_only=True)
     location = serializers.SerializerMethodField()
-    category_data = CategorySerializer(source="category", read_only=True)
+    category_data = ReferenceField("category")
 
     class Meta:
         model = Billboard
@@ -133,6 +336,7 @@ class BillboardListSerializer(serializers.ModelSerializer):
             "contractor",
             "contractor_data",
             "images",
+            "image_sets",
             "employee",
             "size",
             "address",
@@ -140,14 +344,119 @@ class BillboardListSerializer(serializers.ModelSerializer):
             "period",
             "status",
         ]
+        sparse_sources = {
+            "images": ["images"],
+            "image_sets": ["images"],
+            "size": ["width", "height"],
+            "period": ["start_date", "end_date"],
+            "location": ["latitude", "longitude"],
+        }
+
+    def _card_images(self, obj):
+        # Максимум 2 изображения, варианты считаем один раз на объект
+        if getattr(obj, "_card_image_urls", None) is None:
+            build_url = _url_builder(self.context)
+            obj._card_image_urls = [
+                variant_urls(img, build_url) for img in obj.images.all()[:2]
+            ]
+        return obj._card_image_urls
 
     def get_images(self, obj):
-        # Возвращаем только URL изображений для фронтенда
-        images = obj.images.all()[:2]  # Максимум 2 изображения
-        request = self.context.get("request")
-        if request:
-            return [request.build_absolute_uri(img.image.url) for img in images]
-        return [img.image.url for img in images]
+        # Для карточек списка отдаём уменьшенную копию вместо оригинала
+        return [urls["card"] for urls in self._card_images(obj)]
+
+    def get_image_sets(self, obj):
+        return [
+            {
+                "src": urls["card"],
+                "thumbnail": urls["thumbnail"],
+                "srcset": urls["srcset"],
+                "srcset_webp": urls["srcset_webp"],
+                "original": urls["original"],
+            }
+            for urls in self._card_images(obj)
+        ]
 
     def get_location(self, obj):
         return {"lat": float(obj.latitude), "lng": float(obj.longitude)}
+
+
+class LookupField(serializers.Field):
+    """
+    Ссылка на справочник, которая разрешается по заранее загруженной карте
+    context["lookups"][<имя поля>] без запроса к базе на каждую строку
+    """
+
+    default_error_messages = {"not_found": "Объект «{value}» не найден."}
+
+    def to_internal_value(self, data):
+        key = str(data).strip().lower()
+        instance = self.context["lookups"][self.field_name].get(key)
+        if instance is None:
+            self.fail("not_found", value=data)
+        return instance
+
+
+class BillboardImportSerializer(BillboardSerializer):
+    """
+    Проверка строк массового импорта: правила BillboardSerializer,
+    справочники по slug / email / ИНН, даты также в формате ДД.ММ.ГГГГ
+    """
+
+    category = LookupField(required=False, allow_null=True)
+    contractor = LookupField(required=False, allow_null=True)
+    employee = LookupField()
+    start_date = serializers.DateField(input_formats=["iso-8601", "%d.%m.%Y"])
+    end_date = serializers.DateField(input_formats=["iso-8601", "%d.%m.%Y"])
+
+
+class BookingSerializer(serializers.ModelSerializer):
+    contractor_name = serializers.CharField(source="contractor.name", read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            "id",
+            "billboard",
+            "contractor",
+            "contractor_name",
+            "start_date",
+            "end_date",
+            "price",
+            "status",
+            "notes",
+            "created_at",
+            "updated_at",
+        ]
+
+    def validate(self, attrs):
+        """Период не должен пересекаться с другими бронированиями билборда"""
+
+        def value(name):
+            return attrs.get(name, getattr(self.instance, name, None))
+
+        start, end = value("start_date"), value("end_date")
+        if start and end and start > end:
+            raise serializers.ValidationError(
+                {"end_date": "Дата окончания раньше даты начала."}
+            )
+        if value("status") == "cancelled":
+            return attrs
+
+        # Блокируем строку билборда, чтобы параллельные записи проверялись
+        # по очереди (представление выполняет запись в транзакции)
+        billboard = value("billboard")
+        list(Billboard.objects.select_for_update().filter(pk=billboard.pk).values("pk"))
+
+        conflicts = Booking.objects.active().overlapping(start, end).filter(
+            billboard=billboard
+        )
+        if self.instance is not None:
+            conflicts = conflicts.exclude(pk=self.instance.pk)
+        conflict = conflicts.order_by("start_date").first()
+        if conflict is not None:
+            raise serializers.ValidationError(
+                "Билборд уже забронирован на "
+                f"{conflict.start_date:%d.%m.%Y} – {conflict.end_date:%d.%m.%Y}."
+            )
+        return attrs
@@ -0,0 +1,166 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import bump_version
+from .clusters import invalidate_locations
+from .models import (
+    Billboard,
+    BillboardImage,
+    BillboardStatusChange,
+    Booking,
+    Category,
+    Contractor,
+    Employee,
+    SyncTombstone,
+)
+from .rollups import SNAPSHOT_FIELDS, apply_changes, snapshot
+from .search import get_search_backend
+
+
+def billboards_bulk_changed(billboards, previous_locations=(), rollup_changes=()):
+    """
+    Те же действия, что и обработчики save ниже, для массовых операций
+    (bulk_create, bulk_update, update), при которых Django не шлёт сигналы.
+    rollup_changes — пары (прежние, новые значения) для сводок, см. rollups.snapshot;
+    сводки обновляются после COMMIT, чтобы не удлинять транзакцию записи
+    """
+    billboards = list(billboards)
+    apply_changes(rollup_changes, deferred=True)
+    invalidate_clusters_on_commit(
+        [(billboard.latitude, billboard.longitude) for billboard in billboards]
+        + list(previous_locations)
+    )
+    get_search_backend().index([billboard.pk for billboard in billboards])
+    transaction.on_commit(partial(bump_version, Billboard))
+
+
+@receiver(pre_save, sender=Billboard)
+def remember_billboard_location(sender, instance, raw=False, **kwargs):
+    """
+    Запоминаем прежние координаты, чтобы сбросить кэш старых тайлов,
+    прежний статус для истории смены статусов и прежние значения для сводок
+    """
+    instance._previous_location = None
+    instance._previous_status = None
+    instance._previous_rollup = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Billboard.objects.filter(pk=instance.pk)
+        .values_list("latitude", "longitude", *SNAPSHOT_FIELDS)
+        .first()
+    )
+    if previous:
+        instance._previous_location = previous[:2]
+        instance._previous_rollup = previous[2:]
+        instance._previous_status = instance._previous_rollup[0]
+
+
+@receiver(post_save, sender=Billboard)
+def record_status_change(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_previous_status", None)
+    if raw or previous is None or previous == instance.status:
+        return
+    BillboardStatusChange.objects.create(
+        billboard=instance,
+        old_status=previous,
+        new_status=instance.status,
+        source="manual",
+    )
+
+
+@receiver(post_save, sender=Billboard)
+def update_billboard_rollups(sender, instance, raw=False, **kwargs):
+    if not raw:
+        apply_changes([(getattr(instance, "_previous_rollup", None), snapshot(instance))])
+
+
+@receiver(post_delete, sender=Billboard)
+def remove_billboard_rollups(sender, instance, **kwargs):
+    apply_changes([(snapshot(instance), None)])
+
+
+def invalidate_clusters_on_commit(locations):
+    """
+    Сбрасывает кэш тайлов после COMMIT: иначе параллельный запрос собрал бы
+    тайл из ещё не изменённых строк и сохранил его под новой версией
+    """
+    transaction.on_commit(partial(invalidate_locations, list(locations)))
+
+
+@receiver(post_save, sender=Billboard)
+def invalidate_billboard_clusters(sender, instance, raw=False, **kwargs):
+    locations = [(instance.latitude, instance.longitude)]
+    previous = getattr(instance, "_previous_location", None)
+    if previous and previous != locations[0]:
+        locations.append(previous)
+    invalidate_clusters_on_commit(locations)
+
+
+@receiver(post_delete, sender=Billboard)
+def invalidate_deleted_billboard_clusters(sender, instance, **kwargs):
+    invalidate_clusters_on_commit([(instance.latitude, instance.longitude)])
+
+
+@receiver(post_save, sender=Billboard)
+def index_billboard(sender, instance, raw=False, **kwargs):
+    if not raw:
+        get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Billboard)
+def unindex_billboard(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Contractor)
+def reindex_related_billboards(sender, instance, created=False, raw=False, **kwargs):
+    """Имя сотрудника, категории или контрагента входит в индекс его билбордов"""
+    if raw or created:
+        return
+    get_search_backend().index(
+        instance.billboards.order_by().values_list("pk", flat=True).iterator()
+    )
+
+
+def create_search_index(sender, **kwargs):
+    """Создаёт таблицу поискового индекса после migrate и заполняет её"""
+    backend = get_search_backend()
+    if hasattr(backend, "ensure_table") and backend.ensure_table():
+        backend.rebuild()
+
+
+@receiver(post_save, sender=Billboard)
+@receiver(post_save, sender=BillboardImage)
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Contractor)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Billboard)
+@receiver(post_delete, sender=BillboardImage)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Contractor)
+@receiver(post_delete, sender=Employee)
+def invalidate_response_cache(sender, **kwargs):
+    """
+    Сдвигает версию таблицы — ETag и кэш ответов, зависящих от неё, устаревают.
+    Версия меняется только после COMMIT: иначе параллельный запрос получил бы
+    новый ETag, прочитал ещё старые строки и сохранил их в кэш под этим ETag.
+    """
+    transaction.on_commit(partial(bump_version, sender))
+
+
+@receiver(post_delete, sender=Billboard)
+@receiver(post_delete, sender=BillboardImage)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Contractor)
+@receiver(post_delete, sender=Employee)
+def record_sync_tombstone(sender, instance, **kwargs):
+    """Запись об удалении для ленты синхронизации /api/sync/"""
+    SyncTombstone.objects.create(model=sender._meta.label_lower, object_id=instance.pk)
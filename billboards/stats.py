@@ -0,0 +1,73 @@
+from django.db.models import Count, Q, Sum
+
+from .models import Billboard, Category
+
+STATUSES = [value for value, _ in Billboard.STATUS_CHOICES]
+
+
+def _plain(queryset):
+    """Очищает queryset от сортировки и подгрузки связей перед агрегацией"""
+    return queryset.order_by().select_related(None).prefetch_related(None)
+
+
+def _amount(value):
+    """Сумма для JSON: число, как в lib/api.ts (Decimal DRF отдаёт строкой)"""
+    return float(value or 0)
+
+
+def collect_statistics(queryset):
+    """
+    Сводная статистика по билбордам за фиксированное число запросов
+    (4 запроса независимо от количества категорий и контрагентов)
+    """
+    queryset = _plain(queryset)
+
+    # Общие показатели и разбивка по статусам одним запросом
+    aggregates = {"total": Count("id"), "revenue": Sum("price")}
+    for status in STATUSES:
+        aggregates[status] = Count("id", filter=Q(status=status))
+        aggregates[f"{status}_revenue"] = Sum("price", filter=Q(status=status))
+    totals = queryset.aggregate(**aggregates)
+
+    # Разбивка по категориям
+    by_category = {
+        row["category_id"]: row
+        for row in queryset.filter(category__isnull=False)
+        .values("category_id")
+        .annotate(count=Count("id"), revenue=Sum("price"))
+    }
+    categories_stats = {}
+    categories_revenue = {}
+    for category_id, slug in Category.objects.filter(is_active=True).values_list(
+        "id", "slug"
+    ):
+        row = by_category.get(category_id, {})
+        categories_stats[slug] = row.get("count", 0)
+        categories_revenue[slug] = _amount(row.get("revenue"))
+
+    # Разбивка по активным контрагентам (только с билбордами)
+    contractors_stats = {}
+    contractors_revenue = {}
+    for row in (
+        queryset.filter(contractor__is_active=True)
+        .values("contractor_id", "contractor__name")
+        .annotate(count=Count("id"), revenue=Sum("price"))
+        .order_by("contractor__name", "contractor_id")
+    ):
+        contractors_stats[row["contractor__name"]] = row["count"]
+        contractors_revenue[row["contractor__name"]] = _amount(row["revenue"])
+
+    result = {"total": totals["total"]}
+    for status in STATUSES:
+        result[status] = totals[status]
+    result["categories"] = categories_stats
+    result["contractors"] = contractors_stats
+    result["revenue"] = {
+        "total": _amount(totals["revenue"]),
+        "statuses": {
+            status: _amount(totals[f"{status}_revenue"]) for status in STATUSES
+        },
+        "categories": categories_revenue,
+        "contractors": contractors_revenue,
+    }
+    return result
@@ -0,0 +1,198 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Billboard,
+    BillboardImage,
+    Category,
+    Contractor,
+    Employee,
+    SyncTombstone,
+)
+from .serializers import (
+    BillboardImageSyncSerializer,
+    BillboardSerializer,
+    CategorySerializer,
+    ContractorSerializer,
+    EmployeeSyncSerializer,
+)
+
+# Лента -> (модель, queryset, сериализатор)
+FEEDS = {
+    "employees": (Employee, lambda: Employee.objects.all(), EmployeeSyncSerializer),
+    "categories": (
+        Category,
+        lambda: Category.objects.with_billboards_count(),
+        CategorySerializer,
+    ),
+    "contractors": (
+        Contractor,
+        lambda: Contractor.objects.with_billboards_count(),
+        ContractorSerializer,
+    ),
+    "billboards": (
+        Billboard,
+        lambda: Billboard.objects.prefetch_related("images"),
+        BillboardSerializer,
+    ),
+    "images": (
+        BillboardImage,
+        lambda: BillboardImage.objects.all(),
+        BillboardImageSyncSerializer,
+    ),
+}
+FEED_BY_MODEL = {model._meta.label_lower: name for name, (model, _, _) in FEEDS.items()}
+
+# Максимум объектов одной ленты в ответе
+SYNC_PAGE_SIZE = 1000
+# Запас перед началом самой старой открытой транзакции записи (см.
+# write_horizon): updated_at проставляется чуть раньше первой записи
+# транзакции, а часы приложения и базы могут расходиться
+SYNC_WINDOW = timedelta(seconds=5)
+
+
+class InvalidSyncToken(ValueError):
+    pass
+
+
+class SyncBusy(Exception):
+    """Открытая транзакция записи не завершилась за время ожидания блокировки"""
+
+
+def write_horizon(now, database=None):
+    """
+    Момент, раньше которого все транзакции записи уже зафиксированы:
+    изменения с updated_at до него больше не появятся позади курсора,
+    сколько бы ни длилась транзакция.
+
+    PostgreSQL: начало самой старой транзакции, которая уже что-то
+    записала (pg_stat_activity). SQLite пишет по одной транзакции за раз,
+    поэтому достаточно дождаться текущей: кратко захватить блокировку
+    записи (ожидание ограничено busy_timeout).
+    """
+    database = database or connection
+    if database.vendor == "postgresql":
+        with database.cursor() as cursor:
+            cursor.execute(
+                "SELECT MIN(xact_start) FROM pg_stat_activity "
+                "WHERE backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+            )
+            oldest = cursor.fetchone()[0]
+        if oldest is not None:
+            now = min(now, oldest)
+    elif database.vendor == "sqlite" and not database.in_atomic_block:
+        try:
+            with database.cursor() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("ROLLBACK")
+        except OperationalError:
+            raise SyncBusy("Database is busy, retry later")
+    return now - SYNC_WINDOW
+
+
+def encode_token(issued_at, cursors):
+    payload = {
+        "at": issued_at.isoformat(),
+        "cursors": {
+            name: [moment.isoformat(), pk] for name, (moment, pk) in cursors.items()
+        },
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    """(время выдачи, {лента: (updated_at, id)}) из токена"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        cursors = {
+            name: (datetime.fromisoformat(moment), int(pk))
+            for name, (moment, pk) in payload["cursors"].items()
+        }
+        return datetime.fromisoformat(payload["at"]), cursors
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidSyncToken("Invalid sync token")
+
+
+def _page(queryset, field, cursor, horizon):
+    """Следующая страница ленты по ключу (field, id) после курсора до horizon"""
+    queryset = queryset.filter(**{f"{field}__lte": horizon})
+    if cursor is not None:
+        moment, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "pk__gt": pk})
+        )
+    rows = list(queryset.order_by(field, "pk")[: SYNC_PAGE_SIZE + 1])
+    return rows[:SYNC_PAGE_SIZE], len(rows) > SYNC_PAGE_SIZE
+
+
+def _advance(cursor, rows, horizon):
+    """
+    Новый курсор ленты: последний отданный объект или, если до horizon
+    объектов больше нет, сам horizon
+    """
+    if rows:
+        return rows[-1]
+    if cursor is None or cursor[0] < horizon:
+        return (horizon, 0)
+    return cursor
+
+
+def sync_changes(token=None, context=None):
+    """
+    Изменения с момента выдачи token: созданные и изменённые объекты всех лент
+    и id удалённых. Без token (или если он старше срока хранения записей
+    об удалении) отдаётся полный снимок и reset=True.
+    """
+    now = timezone.now()
+    horizon = write_horizon(now)
+    cursors = {}
+    if token:
+        issued_at, cursors = decode_token(token)
+        # Записи об удалении за пропущенный период уже могли быть удалены
+        if issued_at < now - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+            cursors = {}
+    reset = not cursors
+
+    changes = {}
+    has_more = False
+    new_cursors = {}
+    for name, (model, queryset, serializer_class) in FEEDS.items():
+        rows, more = _page(queryset(), "updated_at", cursors.get(name), horizon)
+        has_more = has_more or more
+        changes[name] = serializer_class(rows, many=True, context=context or {}).data
+        new_cursors[name] = _advance(
+            cursors.get(name), [(row.updated_at, row.pk) for row in rows], horizon
+        )
+
+    deleted = {name: [] for name in FEEDS}
+    tombstones = []
+    if not reset:
+        tombstones, more = _page(
+            SyncTombstone.objects.filter(model__in=FEED_BY_MODEL),
+            "deleted_at",
+            cursors.get("deleted"),
+            horizon,
+        )
+        has_more = has_more or more
+        for tombstone in tombstones:
+            deleted[FEED_BY_MODEL[tombstone.model]].append(tombstone.object_id)
+    # Полный снимок уже не содержит удалённых объектов
+    new_cursors["deleted"] = _advance(
+        cursors.get("deleted"),
+        [(tombstone.deleted_at, tombstone.pk) for tombstone in tombstones],
+        horizon,
+    )
+
+    return {
+        "token": encode_token(horizon, new_cursors),
+        "reset": reset,
+        "has_more": has_more,
+        "changes": changes,
+        "deleted": deleted,
+    }
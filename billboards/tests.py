@@ -0,0 +1,838 @@
+import datetime
+import importlib
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from . import reference
+from .benchmarks import benchmark_requests, compare
+from .checks import check_shared_cache
+from .geo import grid_cell
+from .models import (
+    Billboard,
+    BillboardImage,
+    BillboardRollup,
+    BillboardStatusChange,
+    Booking,
+    Category,
+    Contractor,
+    Employee,
+    ImageJob,
+    SyncTombstone,
+)
+from .pagination import KeysetPagination
+from .rollups import MEASURES, rebuild_rollups
+from .search import SearchBackend, SQLiteFTS5Backend, get_search_backend
+from .sync import SYNC_WINDOW, encode_token, write_horizon
+
+STATUSES = ("active", "pending", "expired", "maintenance")
+
+
+def create_inventory(categories, contractors, billboards_per_contractor=2):
+    """Справочники и по несколько билбордов на каждого контрагента"""
+    start = Employee.objects.count()
+    employees = [
+        Employee.objects.create(
+            first_name=f"Имя{index}", last_name="Петров", email=f"e{index}@example.com"
+        )
+        for index in range(start, start + 2)
+    ]
+    start = Category.objects.count()
+    category_list = [
+        Category.objects.create(name=f"Категория {index}", slug=f"category-{index}")
+        for index in range(start, start + categories)
+    ]
+    start = Contractor.objects.count()
+    contractor_list = [
+        Contractor.objects.create(name=f"Контрагент {index}", inn=f"{1000 + index}")
+        for index in range(start, start + contractors)
+    ]
+    number = Billboard.objects.count()
+    for contractor in contractor_list:
+        for _ in range(billboards_per_contractor):
+            Billboard.objects.create(
+                title=f"Билборд {number}",
+                employee=employees[number % len(employees)],
+                category=category_list[number % len(category_list)],
+                contractor=contractor,
+                width=3,
+                height=6,
+                address=f"ул. Навои {number}",
+                latitude=Decimal("41.3") + Decimal(number) / 1000,
+                longitude=Decimal("69.2") + Decimal(number) / 1000,
+                start_date=datetime.date(2026, 1, 1),
+                end_date=datetime.date(2026, 12, 31),
+                status=STATUSES[number % len(STATUSES)],
+                price=Decimal("1500.00"),
+            )
+            number += 1
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Количество SQL-запросов эндпоинта не должно зависеть от количества
+    категорий, контрагентов и строк на странице
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Прогрев справочников перед первым запросом процесса не входит в замеры
+        reference.warm_on_first_request(None)
+
+    def setUp(self):
+        # Кэш ответов сброшен: измеряется полная обработка запроса
+        cache.clear()
+
+    def get(self, url):
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertConstantQueries(self, num, url):
+        """Одинаковое число запросов при малом и большом объёме справочников"""
+        create_inventory(categories=2, contractors=3)
+        reference.warm()
+        with self.assertNumQueries(num):
+            self.get(url)
+        create_inventory(categories=15, contractors=25)
+        cache.clear()
+        reference.warm()
+        with self.assertNumQueries(num):
+            return self.get(url)
+
+
+class StatisticsTests(QueryCountTestCase):
+    def test_query_count(self):
+        # Состояние таблиц для ETag и четыре агрегирующих запроса
+        self.assertConstantQueries(5, "/api/billboards/statistics/")
+
+    def test_revenue_is_numeric(self):
+        create_inventory(categories=2, contractors=1)
+        Category.objects.create(name="Пустая", slug="empty")
+        revenue = self.get("/api/billboards/statistics/").json()["revenue"]
+
+        self.assertEqual(revenue["total"], 3000.0)
+        self.assertEqual(revenue["categories"]["empty"], 0.0)
+        values = [revenue["total"]]
+        for group in ("statuses", "categories", "contractors"):
+            values.extend(revenue[group].values())
+        for value in values:
+            self.assertIsInstance(value, float)
+
+
+class ListQueryCountTests(QueryCountTestCase):
+    def test_category_list(self):
+        # Состояние таблиц для ETag, COUNT для пагинации, страница с количеством
+        # билбордов (GROUP BY)
+        self.assertConstantQueries(3, "/api/categories/")
+
+    def test_contractor_list(self):
+        self.assertConstantQueries(3, "/api/contractors/")
+
+    def test_billboard_list(self):
+        # Справочники и количество билбордов не добавляют запросов на строку
+        response = self.assertConstantQueries(6, "/api/billboards/")
+        self.assertEqual(len(response.json()["results"]), api_settings.PAGE_SIZE)
+
+
+    def test_viewport_returns_compact_markers(self):
+        url = "/api/billboards/viewport/?bbox=69.1,41.2,69.9,41.9&zoom=15"
+        data = self.assertConstantQueries(3, url).json()
+        self.assertEqual(data["count"], Billboard.objects.count())
+        self.assertFalse(data["truncated"])
+        self.assertNotIn("results", data)
+
+        cache.clear()
+        with mock.patch("billboards.views.VIEWPORT_MAX_RESULTS", 5):
+            data = self.get(url).json()
+        self.assertTrue(data["truncated"])
+        self.assertEqual(len(data["id"]), 5)
+
+
+@mock.patch.object(KeysetPagination, "page_size", 4)
+class KeysetPaginationTests(TestCase):
+    url = "/api/billboards/?pagination=cursor"
+
+    def page(self, url):
+        response = self.client.get(url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row["id"] for row in data["results"]], data["next"], data["previous"]
+
+    def walk(self, url, link):
+        """Страницы по ссылкам next или previous и адрес последней из них"""
+        pages = []
+        while url:
+            last_url = url
+            ids, next_url, previous_url = self.page(url)
+            pages.append(ids)
+            url = next_url if link == "next" else previous_url
+        return pages, last_url
+
+    def test_links_with_ties(self):
+        # Половина билбордов создана в одну и ту же секунду: порядок внутри
+        # одинакового created_at задаёт id, строки не теряются и не повторяются
+        create_inventory(categories=1, contractors=7)
+        ids = list(Billboard.objects.order_by("pk").values_list("pk", flat=True))
+        moment = timezone.now()
+        Billboard.objects.filter(pk__in=ids[:7]).update(created_at=moment)
+        Billboard.objects.filter(pk__in=ids[7:]).update(
+            created_at=moment + datetime.timedelta(seconds=1)
+        )
+
+        pages, last_url = self.walk(self.url, "next")
+        self.assertEqual(
+            [pk for page in pages for pk in page], ids[7:][::-1] + ids[:7][::-1]
+        )
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 2])
+        self.assertIsNone(self.page(self.url)[2])
+
+        # Обратный проход по previous возвращает те же страницы
+        self.assertEqual(self.walk(last_url, "previous")[0], pages[::-1])
+
+class AdminQueryCountTests(QueryCountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(
+            User.objects.create_superuser("admin", "admin@example.com", "password")
+        )
+
+    def test_changelists(self):
+        urls = {
+            "/admin/billboards/billboard/": None,
+            "/admin/billboards/category/": None,
+            "/admin/billboards/contractor/": None,
+            "/admin/billboards/employee/": None,
+        }
+        for sizes in ((2, 3), (15, 25)):
+            create_inventory(*sizes)
+            for url, expected in urls.items():
+                with CaptureQueriesContext(connection) as queries:
+                    self.get(url)
+                if expected is None:
+                    urls[url] = len(queries)
+                else:
+                    self.assertEqual(len(queries), expected, url)
+
+    def test_retry_image_jobs(self):
+        create_inventory(categories=1, contractors=1)
+        image = BillboardImage.objects.create(
+            billboard=Billboard.objects.first(),
+            image="billboards/test.jpg",
+            processing_status="failed",
+        )
+        job = ImageJob.objects.create(image=image, status="failed", attempts=3)
+        before = image.updated_at
+
+        response = self.client.post(
+            "/admin/billboards/imagejob/",
+            {"action": "retry_jobs", "_selected_action": [job.pk]},
+        )
+        self.assertEqual(response.status_code, 302)
+        job.refresh_from_db()
+        image.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 0))
+        self.assertEqual(image.processing_status, "pending")
+        self.assertGreater(image.updated_at, before)
+
+
+@skipUnless(connection.vendor == "sqlite", "профиль SQLite")
+class SQLiteConcurrencyTests(SimpleTestCase):
+    """
+    Профиль SQLite (SQLITE_PRAGMAS, журнал WAL): чтение продолжается, пока
+    другое соединение держит открытую транзакцию записи. Проверяется на
+    отдельном файле: тестовая база SQLite в памяти WAL не поддерживает.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "concurrency.sqlite3")
+        database = self.connect()
+        with database.cursor() as cursor:
+            cursor.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+        database.close()
+
+    def connect(self):
+        # Новое соединение получает PRAGMA через сигнал connection_created
+        return DatabaseWrapper(
+            {**connection.settings_dict, "NAME": self.path}, alias="concurrency"
+        )
+
+    def count(self, database):
+        with database.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM items")
+            return cursor.fetchone()[0]
+
+    def test_reads_during_write_transaction(self):
+        locked = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def write():
+            writer = self.connect()
+            try:
+                with writer.cursor() as cursor:
+                    # EXCLUSIVE без WAL не дал бы читать до COMMIT
+                    cursor.execute("BEGIN EXCLUSIVE")
+                    cursor.executemany(
+                        "INSERT INTO items (value) VALUES (%s)",
+                        [(f"value {index}",) for index in range(1000)],
+                    )
+                    locked.set()
+                    release.wait(10)
+                    cursor.execute("COMMIT")
+            except Exception as exc:
+                errors.append(exc)
+                locked.set()
+            finally:
+                writer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        reader = self.connect()
+        try:
+            self.assertTrue(locked.wait(10))
+            with reader.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                self.assertEqual(
+                    cursor.fetchone()[0], settings.SQLITE_PRAGMAS["journal_mode"].lower()
+                )
+            started = time.perf_counter()
+            for _ in range(20):
+                # Читатель видит последнее зафиксированное состояние
+                self.assertEqual(self.count(reader), 0)
+            self.assertLess(time.perf_counter() - started, 1.0)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.count(reader), 1000)
+        reader.close()
+
+    def test_sync_horizon_waits_for_open_write(self):
+        # Строки долгой транзакции с updated_at раньше горизонта должны быть
+        # зафиксированы к моменту выдачи токена
+        locked = threading.Event()
+        committed = threading.Event()
+
+        def write():
+            writer = self.connect()
+            try:
+                with writer.cursor() as cursor:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    cursor.execute("INSERT INTO items (value) VALUES ('slow')")
+                    locked.set()
+                    time.sleep(0.3)
+                    committed.set()
+                    cursor.execute("COMMIT")
+            finally:
+                writer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        reader = self.connect()
+        try:
+            self.assertTrue(locked.wait(10))
+            write_horizon(timezone.now(), reader)
+            self.assertTrue(committed.is_set())
+            self.assertEqual(self.count(reader), 1)
+        finally:
+            thread.join()
+            reader.close()
+
+
+@skipUnless(connection.vendor == "postgresql", "профиль DB_ENGINE=postgresql")
+class PostgreSQLConcurrencyTests(TransactionTestCase):
+    """
+    Профиль PostgreSQL (MVCC): чтение не ждёт открытую транзакцию записи,
+    горизонт синхронизации не дальше начала этой транзакции.
+    Записывающая транзакция идёт в отдельном потоке со своим соединением.
+    """
+
+    def setUp(self):
+        self.locked = threading.Event()
+        self.release = threading.Event()
+        self.errors = []
+        self.thread = threading.Thread(target=self.write)
+        self.thread.start()
+        self.addCleanup(self.thread.join)
+        self.addCleanup(self.release.set)
+        self.assertTrue(self.locked.wait(10))
+
+    def write(self):
+        try:
+            with transaction.atomic():
+                Category.objects.bulk_create(
+                    Category(name=f"Категория {index}", slug=f"category-{index}")
+                    for index in range(1000)
+                )
+                self.locked.set()
+                self.release.wait(10)
+        except Exception as exc:
+            self.errors.append(exc)
+            self.locked.set()
+        finally:
+            connection.close()
+
+    def test_reads_during_write_transaction(self):
+        started = time.perf_counter()
+        for _ in range(20):
+            # Читатель видит последнее зафиксированное состояние
+            self.assertEqual(Category.objects.count(), 0)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+        self.release.set()
+        self.thread.join()
+        self.assertEqual(self.errors, [])
+        self.assertEqual(Category.objects.count(), 1000)
+
+    def test_sync_horizon_before_open_write(self):
+        # Транзакция записи началась раньше now: горизонт сдвигается к её началу
+        now = timezone.now()
+        self.assertLess(write_horizon(now), now - SYNC_WINDOW)
+        self.release.set()
+        self.thread.join()
+        self.assertEqual(write_horizon(now), now - SYNC_WINDOW)
+
+
+class RollupTests(TestCase):
+    def rollup_rows(self):
+        return sorted(
+            BillboardRollup.objects.values_list(
+                "dimension", "key", "period", "date", *MEASURES
+            )
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        # Билборды с общими строками сводок: вторая запись прибавляется к
+        # существующей строке (upsert), а не вставляет её повторно
+        create_inventory(categories=2, contractors=3)
+        billboard = Billboard.objects.filter(status="active").first()
+        billboard.end_date = datetime.date(2026, 3, 15)
+        billboard.price = Decimal("777.77")
+        billboard.save()
+        Billboard.objects.filter(status="expired").first().delete()
+
+        incremental = self.rollup_rows()
+        self.assertTrue(incremental)
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_rows())
+
+
+class GridCellMigrationTests(TestCase):
+    def test_backfill_fills_missing_cells(self):
+        create_inventory(categories=1, contractors=2)
+        Billboard.objects.update(grid_cell=None)
+        migration = importlib.import_module(
+            "billboards.migrations.0002_categories_contractors_bookings_rollups"
+        )
+        migration.fill_grid_cells(apps, None)
+
+        for billboard in Billboard.objects.all():
+            self.assertIsNotNone(billboard.grid_cell)
+            self.assertEqual(
+                billboard.grid_cell, grid_cell(billboard.latitude, billboard.longitude)
+            )
+
+
+class BulkStatusTests(TestCase):
+    def change_status(self, ids, status):
+        return self.client.post(
+            "/api/billboards/bulk/status/",
+            {"ids": ids, "status": status},
+            content_type="application/json",
+        )
+
+    def test_query_count(self):
+        # Блокировка строк, UPDATE, история статусов, поисковый индекс; после
+        # COMMIT — один upsert сводок на пачку. Не зависит от числа билбордов
+        # и длины аренд
+        for sizes in ((2, 3), (15, 25)):
+            start = Billboard.objects.count()
+            create_inventory(*sizes)
+            ids = list(
+                Billboard.objects.order_by("pk").values_list("pk", flat=True)[start:]
+            )
+            reference.warm()
+            with self.assertNumQueries(10), self.captureOnCommitCallbacks(execute=True):
+                response = self.change_status(ids, "active")
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()["changed"])
+
+        incremental = RollupTests.rollup_rows(self)
+        rebuild_rollups()
+        self.assertEqual(incremental, RollupTests.rollup_rows(self))
+
+    def test_invalid_id_changes_nothing(self):
+        create_inventory(categories=1, contractors=1)
+        ids = list(Billboard.objects.values_list("pk", flat=True))
+        with self.assertNumQueries(0):
+            response = self.change_status([*ids, "x"], "maintenance")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Billboard.objects.filter(status="maintenance").exists())
+
+
+class BulkUpdateTests(TestCase):
+    def bulk_update(self, items):
+        return self.client.patch(
+            "/api/billboards/bulk/", items, content_type="application/json"
+        )
+
+    def state(self):
+        return list(
+            Billboard.objects.order_by("pk").values_list("pk", "status", "title", "updated_at")
+        )
+
+    def test_invalid_id_rolls_back_whole_batch(self):
+        create_inventory(categories=1, contractors=2)
+        ids = list(Billboard.objects.order_by("pk").values_list("pk", flat=True))
+        before = self.state()
+        items = [{"id": pk, "status": "maintenance", "title": "Новое"} for pk in ids]
+        items.append({"id": max(ids) + 100, "status": "maintenance"})
+
+        reference.warm()
+        # Справочники сериализатора (3), SAVEPOINT, блокировка строк одним
+        # SELECT ... IN и RELEASE: при ошибке ни одного INSERT/UPDATE
+        with self.assertNumQueries(6), self.captureOnCommitCallbacks(execute=True):
+            response = self.bulk_update(items)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()["errors"],
+            [{"index": len(ids), "errors": {"id": ["Билборд не найден."]}}],
+        )
+        self.assertEqual(self.state(), before)
+        self.assertFalse(BillboardStatusChange.objects.exists())
+
+    def test_valid_batch_is_applied(self):
+        create_inventory(categories=1, contractors=2)
+        ids = list(Billboard.objects.order_by("pk").values_list("pk", flat=True))
+        response = self.bulk_update([{"id": pk, "status": "maintenance"} for pk in ids])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["updated"], len(ids))
+        self.assertEqual(
+            set(Billboard.objects.values_list("status", flat=True)), {"maintenance"}
+        )
+
+
+class SearchTests(TestCase):
+    def search(self, query):
+        response = self.client.get(
+            "/api/billboards/", {"search": query}, HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return {row["id"] for row in response.json()["results"]}
+
+    def test_backend_must_filter(self):
+        with self.assertRaises(TypeError):
+            SearchBackend()
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 есть только в SQLite")
+    def test_fts5_cyrillic_prefix(self):
+        self.assertIsInstance(get_search_backend(), SQLiteFTS5Backend)
+        create_inventory(categories=1, contractors=2)
+        billboard = Billboard.objects.order_by("pk").first()
+        billboard.address = "пр. Амира Темура, 1"
+        billboard.title = "Щит у ёлки"
+        billboard.save()
+        others = set(
+            Billboard.objects.exclude(pk=billboard.pk).values_list("pk", flat=True)
+        )
+
+        # Префикс слова без учёта регистра, «ё» совпадает с «е»
+        self.assertEqual(self.search("тем"), {billboard.pk})
+        self.assertEqual(self.search("ТЕМУР"), {billboard.pk})
+        self.assertEqual(self.search("елк"), {billboard.pk})
+        self.assertEqual(self.search("Нав"), others)
+        self.assertEqual(self.search("амира нав"), set())
+        self.assertEqual(self.search("Петров"), others | {billboard.pk})
+
+
+class BookingTests(TestCase):
+    """Границы периодов включительно: соседние даты не пересекаются"""
+
+    def setUp(self):
+        create_inventory(categories=1, contractors=1, billboards_per_contractor=1)
+        self.billboard = Billboard.objects.get()
+        Booking.objects.create(
+            billboard=self.billboard,
+            start_date=datetime.date(2027, 3, 10),
+            end_date=datetime.date(2027, 3, 20),
+        )
+
+    def book(self, start, end, **extra):
+        return self.client.post(
+            "/api/bookings/",
+            {"billboard": self.billboard.pk, "start_date": start, "end_date": end, **extra},
+            content_type="application/json",
+        )
+
+    def available(self, start, end):
+        return Billboard.objects.available(
+            datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+        ).exists()
+
+    def test_adjacent_periods_allowed(self):
+        self.assertEqual(self.book("2027-03-01", "2027-03-09").status_code, 201)
+        self.assertEqual(self.book("2027-03-21", "2027-03-31").status_code, 201)
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_one_day_overlap_rejected(self):
+        for start, end in (("2027-03-01", "2027-03-10"), ("2027-03-20", "2027-03-31")):
+            response = self.book(start, end)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json()["non_field_errors"],
+                ["Билборд уже забронирован на 10.03.2027 – 20.03.2027."],
+            )
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_cancelled_booking_does_not_conflict(self):
+        Booking.objects.update(status="cancelled")
+        self.assertEqual(self.book("2027-03-15", "2027-03-16").status_code, 201)
+        response = self.book("2027-03-10", "2027-03-20", status="cancelled")
+        self.assertEqual(response.status_code, 201)
+
+    def test_available_filter(self):
+        Booking.objects.create(
+            billboard=self.billboard,
+            start_date=datetime.date(2027, 4, 1),
+            end_date=datetime.date(2027, 4, 5),
+        )
+        self.assertTrue(self.available("2027-03-01", "2027-03-09"))
+        self.assertTrue(self.available("2027-03-21", "2027-03-31"))
+        self.assertFalse(self.available("2027-03-01", "2027-03-10"))
+        self.assertFalse(self.available("2027-03-20", "2027-03-25"))
+        # Период целиком накрывает бронирование
+        self.assertFalse(self.available("2027-03-01", "2027-03-31"))
+        # Текущая аренда билборда (2026 год) тоже занимает его
+        self.assertFalse(self.available("2026-12-31", "2027-01-05"))
+
+        Booking.objects.filter(start_date__month=3).update(status="cancelled")
+        self.assertTrue(self.available("2027-03-01", "2027-03-31"))
+        self.assertFalse(self.available("2027-03-01", "2027-04-01"))
+
+        response = self.client.get(
+            "/api/billboards/available/?start=2027-03-21&end=2027-03-31",
+            HTTP_ACCEPT="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]], [self.billboard.pk]
+        )
+
+
+class ClusterCacheTests(TestCase):
+    url = "/api/billboards/clusters/?bbox=69.1,41.2,69.4,41.4&zoom=11"
+
+    def slugs(self):
+        response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.status_code, 200)
+        return {
+            slug for cluster in response.json()["clusters"] for slug in cluster["categories"]
+        }
+
+    def test_category_change_invalidates_tiles(self):
+        cache.clear()
+        create_inventory(categories=1, contractors=2)
+        self.assertEqual(self.slugs(), {"category-0"})
+
+        category = Category.objects.get()
+        category.slug = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        self.assertEqual(self.slugs(), {"renamed"})
+
+    def test_tiles_invalidated_after_commit(self):
+        cache.clear()
+        create_inventory(categories=1, contractors=2)
+        total = Billboard.objects.count()
+
+        def count():
+            response = self.client.get(self.url, HTTP_ACCEPT="application/json")
+            return sum(cluster["count"] for cluster in response.json()["clusters"])
+
+        self.assertEqual(count(), total)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Billboard.objects.first().delete()
+        # До COMMIT версии тайлов не сбрасываются
+        self.assertEqual(count(), total)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(count(), total - 1)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        # Без запаса горизонт — момент запроса: в тесте нет параллельных записей
+        patcher = mock.patch("billboards.sync.SYNC_WINDOW", datetime.timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def sync(self, token=None):
+        response = self.client.get(
+            "/api/sync/", {"token": token} if token else {}, HTTP_ACCEPT="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_token_paging(self):
+        create_inventory(categories=3, contractors=2)
+
+        received, token, pages = {}, None, 0
+        with mock.patch("billboards.sync.SYNC_PAGE_SIZE", 2):
+            while True:
+                data = self.sync(token)
+                self.assertEqual(data["reset"], token is None)
+                for name, items in data["changes"].items():
+                    received.setdefault(name, []).extend(item["id"] for item in items)
+                token = data["token"]
+                pages += 1
+                if not data["has_more"]:
+                    break
+
+        self.assertEqual(pages, 2)
+        for name, model in (
+            ("billboards", Billboard),
+            ("categories", Category),
+            ("contractors", Contractor),
+            ("employees", Employee),
+        ):
+            expected = model.objects.order_by("pk").values_list("pk", flat=True)
+            self.assertEqual(sorted(received[name]), list(expected))
+        self.assertTrue(all(not items for items in self.sync(token)["changes"].values()))
+
+        category = Category.objects.create(name="Новая", slug="new")
+        data = self.sync(token)
+        self.assertEqual(
+            [item["id"] for item in data["changes"]["categories"]], [category.pk]
+        )
+        self.assertEqual(data["changes"]["billboards"], [])
+
+    def test_recent_changes_wait_for_window(self):
+        create_inventory(categories=1, contractors=1)
+        with mock.patch("billboards.sync.SYNC_WINDOW", datetime.timedelta(minutes=1)):
+            data = self.sync()
+        self.assertEqual(data["changes"]["billboards"], [])
+        # Курсор не ушёл дальше горизонта: изменения придут позже
+        data = self.sync(data["token"])
+        self.assertEqual(len(data["changes"]["billboards"]), Billboard.objects.count())
+
+    def test_tombstones(self):
+        create_inventory(categories=1, contractors=2)
+        token = self.sync()["token"]
+
+        billboard = Billboard.objects.first()
+        pk = billboard.pk
+        billboard.delete()
+        data = self.sync(token)
+        self.assertFalse(data["reset"])
+        self.assertEqual(data["deleted"]["billboards"], [pk])
+        self.assertEqual(SyncTombstone.objects.get().object_id, pk)
+
+        data = self.sync(data["token"])
+        self.assertEqual(data["deleted"]["billboards"], [])
+
+    def test_expired_token_resets(self):
+        create_inventory(categories=1, contractors=1)
+        days = settings.SYNC_TOMBSTONE_DAYS + 1
+        issued_at = timezone.now() - datetime.timedelta(days=days)
+        data = self.sync(encode_token(issued_at, {"billboards": (issued_at, 0)}))
+        self.assertTrue(data["reset"])
+        self.assertEqual(len(data["changes"]["billboards"]), Billboard.objects.count())
+
+
+class ResponseCacheTests(TestCase):
+    def test_cached_links_follow_request_host(self):
+        create_inventory(categories=2, contractors=11)
+        for url in ("/api/billboards/", "/api/async/billboards/"):
+            cache.clear()
+            for host, secure in (("localhost", False), ("api.location.utu-ranch.uz", True)):
+                response = self.client.get(
+                    url, HTTP_ACCEPT="application/json", HTTP_HOST=host, secure=secure
+                )
+                scheme = "https" if secure else "http"
+                self.assertTrue(
+                    response.json()["next"].startswith(f"{scheme}://{host}{url}"), url
+                )
+
+
+class ReferenceCacheTests(TestCase):
+    def test_no_queries_once_warm(self):
+        create_inventory(categories=2, contractors=2)
+        reference.warm()
+        with self.assertNumQueries(0):
+            reference.load(*reference.REFERENCE_MODELS)
+
+    def test_reload_after_change(self):
+        create_inventory(categories=1, contractors=1)
+        reference.warm()
+        category = Category.objects.get()
+        category.name = "Новое имя"
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        payloads = reference.load(Category)[Category]
+        self.assertEqual(payloads[category.pk]["name"], "Новое имя")
+
+    def test_shared_cache_check(self):
+        locmem = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        with override_settings(CACHES={"default": locmem}):
+            self.assertEqual(
+                [warning.id for warning in check_shared_cache(None)], ["billboards.W001"]
+            )
+        shared = {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "billboards_cache",
+        }
+        with override_settings(CACHES={"default": shared}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, **headers):
+        return self.client.get("/metrics", **headers).status_code
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=False)
+    def test_hidden_without_token(self):
+        self.assertEqual(self.get(), 404)
+
+    @override_settings(METRICS_TOKEN=None, DEBUG=True)
+    def test_open_in_debug(self):
+        self.assertEqual(self.get(), 200)
+
+    @override_settings(METRICS_TOKEN="secret", DEBUG=False)
+    def test_token_required(self):
+        self.assertEqual(self.get(), 403)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer wrong"), 403)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION="Bearer secret"), 200)
+
+
+class BenchmarkTests(TestCase):
+    def test_labels_do_not_depend_on_data(self):
+        create_inventory(categories=1, contractors=1)
+        requests = dict(benchmark_requests())
+        url = requests["billboard-available?start={period_start}&end={period_end}"]
+        start = (timezone.localdate() + datetime.timedelta(days=180)).isoformat()
+        self.assertIn(f"start={start}", url)
+
+    def test_compare_reports_missing_labels(self):
+        result = {"queries": 3, "p95_ms": 10.0, "bytes": 100}
+        self.assertEqual(
+            compare({"list": result, "detail": result}, {"list": result}),
+            ["detail: нет в базовой линии (--update-baseline)"],
+        )
@@ -1,13 +1,31 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BillboardViewSet, EmployeeViewSet, CategoryViewSet, ContractorViewSet
+from . import async_views
+from .views import (
+    AnalyticsViewSet,
+    BillboardViewSet,
+    BookingViewSet,
+    EmployeeViewSet,
+    CategoryViewSet,
+    ContractorViewSet,
+    SyncViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'billboards', BillboardViewSet)
 router.register(r'employees', EmployeeViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'contractors', ContractorViewSet)
+router.register(r'bookings', BookingViewSet)
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Асинхронные варианты эндпоинтов чтения (полезны под ASGI)
+    path('async/billboards/', async_views.billboard_list, name='async-billboard-list'),
+    path('async/billboards/markers/', async_views.billboard_markers, name='async-billboard-markers'),
+    path('async/billboards/statistics/', async_views.billboard_statistics, name='async-billboard-statistics'),
+    path('async/categories/', async_views.category_list, name='async-category-list'),
+    path('async/employees/', async_views.employee_list, name='async-employee-list'),
 ]
@@ -1,116 +1,253 @@
+from datetime import date
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from django.db.models import Q, Count
-from .models import Billboard, Employee, Category, Contractor
+from rest_framework.settings import api_settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from .bulk import (
+    BulkRequestError,
+    bulk_change_status,
+    bulk_create_billboards,
+    bulk_update_billboards,
+)
+from .caching import ConditionalCacheMixin
+from .models import (
+    Billboard,
+    BillboardImage,
+    Booking,
+    Employee,
+    Category,
+    Contractor,
+)
 from .serializers import (
     BillboardSerializer,
     BillboardListSerializer,
+    BookingSerializer,
     EmployeeSerializer,
     CategorySerializer,
     ContractorSerializer,
 )
+from .clusters import MAX_CLUSTER_ZOOM, filters_cache_key, get_clusters
+from .exporters import EXPORT_FORMATS, stream_export
+from .filters import filter_billboards
+from .geo import bbox_q, parse_bbox, parse_zoom
+from .importers import (
+    IMPORT_FORMATS,
+    BillboardImporter,
+    ImportFormatError,
+    detect_format,
+    read_rows,
+)
+from .markers import compact_markers
+from .renderers import optional_renderers
+from .rollups import DIMENSIONS, MAX_POINTS, default_range, rollup_series
+from .search import get_search_backend
+from .stats import collect_statistics
+from .sync import InvalidSyncToken, SyncBusy, sync_changes
+
+# Максимум маркеров в ответе для области карты
+VIEWPORT_MAX_RESULTS = 2000
+# Максимум ошибок импорта в ответе API
+IMPORT_MAX_ERRORS = 1000
+
+
+def parse_period(params):
+    """Период из параметров start и end (YYYY-MM-DD), None если не задан"""
+    start, end = params.get("start"), params.get("end")
+    if not start and not end:
+        return None
+    if not start or not end:
+        raise ValueError("Both start and end parameters are required")
+    try:
+        start, end = date.fromisoformat(start), date.fromisoformat(end)
+    except ValueError:
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    if start > end:
+        raise ValueError("start must not be later than end")
+    return start, end
+
+
+class SparseFieldsMixin:
+    """
+    Применяет ?fields= / ?expand= к SQL: загружаются только столбцы и связи,
+    нужные полям, которые останутся в ответе
+    """
+
+    sparse_actions = ("list", "retrieve")
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if self.action in self.sparse_actions and ("fields" in params or "expand" in params):
+            queryset = self.get_serializer().restrict_queryset(queryset)
+        return queryset
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.filter(is_active=True)
+
+class CategoryViewSet(
+    ConditionalCacheMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet
+):
+    cache_dependencies = (Category, Billboard)
+    queryset = Category.objects.filter(is_active=True).with_billboards_count()
     serializer_class = CategorySerializer
 
 
-class ContractorViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Contractor.objects.filter(is_active=True)
+class ContractorViewSet(
+    ConditionalCacheMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet
+):
+    cache_dependencies = (Contractor, Billboard)
+    queryset = Contractor.objects.filter(is_active=True).with_billboards_count()
     serializer_class = ContractorSerializer
 
 
-class BillboardViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Billboard.objects.all()
-        .select_related("employee", "category", "contractor")
-        .prefetch_related("images")
+class BillboardViewSet(ConditionalCacheMixin, SparseFieldsMixin, viewsets.ModelViewSet):
+    cache_dependencies = (
+        Billboard,
+        Category,
+        Contractor,
+        Employee,
+        BillboardImage,
+        Booking,
+    )
+    cached_actions = (
+        "list",
+        "available",
+        "markers",
+        "retrieve",
+        "statistics",
+        "viewport",
+        "expiring_soon",
+        "by_category",
+        "by_contractor",
     )
+    sparse_actions = (
+        "list",
+        "retrieve",
+        "available",
+        "expiring_soon",
+        "by_category",
+        "by_contractor",
+    )
+    # Категория, контрагент и сотрудник берутся из кэша справочников (reference.py)
+    queryset = Billboard.objects.all().prefetch_related("images")
 
     def get_serializer_class(self):
-        if self.action == "list":
+        if self.action in ("list", "available"):
             return BillboardListSerializer
         return BillboardSerializer
 
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        # Фильтрация по категории (по slug или id)
-        category = self.request.query_params.get("category", None)
-        if category:
-            if category.isdigit():
-                queryset = queryset.filter(category_id=category)
-            else:
-                queryset = queryset.filter(category__slug=category)
-
-        # Фильтрация по статусу
-        status_filter = self.request.query_params.get("status", None)
-        if status_filter:
-            queryset = queryset.filter(status=status_filter)
-
-        # Фильтрация по сотруднику
-        employee_id = self.request.query_params.get("employee", None)
-        if employee_id:
-            queryset = queryset.filter(employee_id=employee_id)
-
-        # Фильтрация по контрагенту
-        contractor_id = self.request.query_params.get("contractor", None)
-        if contractor_id:
-            queryset = queryset.filter(contractor_id=contractor_id)
-
-        # Поиск по адресу или названию
-        search = self.request.query_params.get("search", None)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search)
-                | Q(address__icontains=search)
-                | Q(employee__first_name__icontains=search)
-                | Q(employee__last_name__icontains=search)
-                | Q(category__name__icontains=search)
-                | Q(contractor__name__icontains=search)
-                | Q(contractor__contact_person__icontains=search)
+        params = self.request.query_params
+        if params.get("near") and (
+            "cursor" in params or params.get("pagination") == "cursor"
+        ):
+            raise ValidationError(
+                {"error": "near cannot be combined with cursor pagination"}
             )
+        try:
+            queryset = filter_billboards(queryset, params)
+        except ValueError as exc:
+            raise ValidationError({"error": str(exc)})
+
+        # Сортировка по релевантности поиска (при near — по расстоянию)
+        search = params.get("search", None)
+        if search and not params.get("near") and self.action in self.sparse_actions:
+            queryset = get_search_backend().rank_queryset(queryset, search)
 
         return queryset
 
     @action(detail=False, methods=["get"])
     def statistics(self, request):
         """Получение статистики по билбордам"""
-        queryset = self.get_queryset()
+        return Response(collect_statistics(self.get_queryset()))
 
-        # Общая статистика
-        total = queryset.count()
-        active = queryset.filter(status="active").count()
-        pending = queryset.filter(status="pending").count()
-        expired = queryset.filter(status="expired").count()
-        maintenance = queryset.filter(status="maintenance").count()
-
-        # Статистика по категориям
-        categories_stats = {}
-        for category in Category.objects.filter(is_active=True):
-            categories_stats[category.slug] = queryset.filter(category=category).count()
-
-        # Статистика по контрагентам
-        contractors_stats = {}
-        for contractor in Contractor.objects.filter(is_active=True):
-            count = queryset.filter(contractor=contractor).count()
-            if count > 0:
-                contractors_stats[contractor.name] = count
+    @action(detail=False, methods=["get"])
+    def available(self, request):
+        """Билборды, свободные весь период start..end (с фильтрами списка)"""
+        try:
+            period = parse_period(request.query_params)
+            if period is None:
+                raise ValueError("start and end parameters are required")
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
 
+        queryset = self.get_queryset().available(*period)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def viewport(self, request):
+        """
+        Маркеры билбордов в видимой области карты (bbox=west,south,east,north)
+        в компактном формате markers; полные данные — через detail по id
+        """
+        try:
+            bbox = parse_bbox(request.query_params.get("bbox"))
+            zoom = parse_zoom(request.query_params.get("zoom"))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        queryset = self.get_queryset().filter(bbox_q(bbox))
         return Response(
             {
-                "total": total,
-                "active": active,
-                "pending": pending,
-                "expired": expired,
-                "maintenance": maintenance,
-                "categories": categories_stats,
-                "contractors": contractors_stats,
+                "bbox": list(bbox),
+                "zoom": zoom,
+                **compact_markers(queryset, limit=VIEWPORT_MAX_RESULTS),
             }
         )
 
+    @action(
+        detail=False,
+        methods=["get"],
+        renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES + optional_renderers(),
+    )
+    def markers(self, request):
+        """
+        Компактные маркеры для карты: колонки id/lat/lng/status/category
+        и словарь категорий (фильтры списка, необязательный bbox)
+        """
+        queryset = self.get_queryset()
+        if request.query_params.get("bbox"):
+            try:
+                bbox = parse_bbox(request.query_params["bbox"])
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=400)
+            queryset = queryset.filter(bbox_q(bbox))
+        return Response(compact_markers(queryset))
+
+    @action(detail=False, methods=["get"])
+    def clusters(self, request):
+        """Кластеры билбордов для мелких масштабов карты (bbox и zoom обязательны)"""
+        try:
+            bbox = parse_bbox(request.query_params.get("bbox"))
+            zoom = parse_zoom(request.query_params.get("zoom"))
+            if zoom is None:
+                raise ValueError("zoom parameter is required")
+            if zoom > MAX_CLUSTER_ZOOM:
+                raise ValueError(
+                    f"zoom must not exceed {MAX_CLUSTER_ZOOM}, use viewport instead"
+                )
+            data = get_clusters(
+                self.get_queryset(),
+                bbox,
+                zoom,
+                filters_cache_key(request.query_params),
+            )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        return Response({"bbox": list(bbox), "zoom": zoom, **data})
+
     @action(detail=False, methods=["get"])
     def expiring_soon(self, request):
         """Билборды, срок аренды которых истекает в ближайшие 30 дней"""
@@ -153,7 +290,221 @@ class BillboardViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"export/(?P<export_format>csv|ndjson|geojson)",
+    )
+    def export(self, request, export_format):
+        """Потоковая выгрузка билбордов (CSV, NDJSON, GeoJSON) с фильтрами списка"""
+        response = StreamingHttpResponse(
+            stream_export(self.get_queryset(), export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        filename = f"billboards-{timezone.localdate():%Y%m%d}.{export_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def bulk_import(self, request):
+        """Массовый импорт билбордов из файла (CSV, XLSX, GeoJSON)"""
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "File is required"}, status=400)
+        dry_run = request.data.get("dry_run", "").lower() in ("1", "true", "yes")
+
+        errors = []
+
+        def on_error(error):
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append(error)
+
+        try:
+            fmt = request.data.get("format") or detect_format(upload.name)
+            if fmt not in IMPORT_FORMATS:
+                raise ImportFormatError(f"Unsupported file format: {fmt}")
+            result = BillboardImporter(dry_run=dry_run, on_error=on_error).run(
+                read_rows(upload.file, fmt)
+            )
+        except ImportFormatError as exc:
+            return Response({"error": str(exc)}, status=400)
 
-class EmployeeViewSet(viewsets.ReadOnlyModelViewSet):
+        return Response(
+            {
+                **result,
+                "dry_run": dry_run,
+                "errors": errors,
+                "errors_truncated": result["failed"] > len(errors),
+            },
+            status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        """
+        Пакетное создание: список объектов в формате импорта.
+        Ответ — id созданных билбордов в порядке запроса.
+        """
+        try:
+            results, errors = bulk_create_billboards(request.data)
+        except BulkRequestError as exc:
+            return Response({"error": str(exc)}, status=400)
+        if errors:
+            return Response({"error": "Validation failed", "errors": errors}, status=400)
+        return Response(
+            {"created": len(results), "results": results},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Пакетное частичное обновление: список объектов с id и изменяемыми полями"""
+        try:
+            results, errors = bulk_update_billboards(request.data)
+        except BulkRequestError as exc:
+            return Response({"error": str(exc)}, status=400)
+        if errors:
+            return Response({"error": "Validation failed", "errors": errors}, status=400)
+        return Response({"updated": len(results), "results": results})
+
+    @action(detail=False, methods=["post"], url_path="bulk/status")
+    def bulk_status(self, request):
+        """Смена статуса списка билбордов: {"ids": [...], "status": "..."}"""
+        if not isinstance(request.data, dict):
+            return Response({"error": "Object with ids and status expected"}, status=400)
+        try:
+            result = bulk_change_status(
+                request.data.get("ids"), request.data.get("status")
+            )
+        except BulkRequestError as exc:
+            return Response({"error": str(exc)}, status=400)
+        return Response({"status": request.data["status"], **result})
+
+
+class EmployeeViewSet(
+    ConditionalCacheMixin, SparseFieldsMixin, viewsets.ReadOnlyModelViewSet
+):
+    cache_dependencies = (Employee,)
     queryset = Employee.objects.filter(is_active=True)
     serializer_class = EmployeeSerializer
+
+
+class BookingViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
+    cache_dependencies = (Booking, Contractor)
+    queryset = Booking.objects.select_related("contractor")
+    serializer_class = BookingSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        for name in ("billboard", "contractor"):
+            value = params.get(name)
+            if value:
+                if not value.isdigit():
+                    raise ValidationError({"error": f"{name} must be an integer id"})
+                queryset = queryset.filter(**{name: int(value)})
+
+        value = params.get("status")
+        if value:
+            statuses = dict(Booking.STATUS_CHOICES)
+            if value not in statuses:
+                raise ValidationError(
+                    {"error": f"status must be one of: {', '.join(statuses)}"}
+                )
+            queryset = queryset.filter(status=value)
+
+        # Бронирования, пересекающиеся с периодом start..end
+        try:
+            period = parse_period(params)
+        except ValueError as exc:
+            raise ValidationError({"error": str(exc)})
+        if period is not None:
+            queryset = queryset.overlapping(*period)
+
+        return queryset
+
+    # Проверка пересечений и запись выполняются в одной транзакции
+    @transaction.atomic
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @transaction.atomic
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Дельта-синхронизация для офлайн-клиентов: GET /api/sync/?token=...
+    возвращает объекты, созданные или изменённые после выдачи токена,
+    id удалённых объектов и новый токен. Если has_more=true, запрос
+    повторяется с новым токеном.
+    """
+
+    def list(self, request):
+        try:
+            data = sync_changes(
+                request.query_params.get("token"), context={"request": request}
+            )
+        except InvalidSyncToken as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except SyncBusy as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+        return Response(data)
+
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    """
+    Занятость и выручка во времени из сводок BillboardRollup:
+    GET /api/analytics/?period=day|month&dimension=total|category|contractor|employee
+    &start=YYYY-MM-DD&end=YYYY-MM-DD&key=<id>
+    """
+
+    def list(self, request):
+        params = request.query_params
+        period = params.get("period", "month")
+        dimension = params.get("dimension", "total")
+        key = params.get("key")
+        try:
+            if period not in MAX_POINTS:
+                raise ValueError("period must be one of: day, month")
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"dimension must be one of: {', '.join(DIMENSIONS)}")
+            if key is not None and not key.isdigit():
+                raise ValueError("key must be an integer")
+            start, end = parse_period(params) or default_range(
+                period, timezone.localdate()
+            )
+            points = (
+                (end - start).days + 1
+                if period == "day"
+                else (end.year - start.year) * 12 + end.month - start.month + 1
+            )
+            if points > MAX_POINTS[period]:
+                raise ValueError(
+                    f"Period is too long, at most {MAX_POINTS[period]} points per request"
+                )
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        return Response(
+            {
+                "period": period,
+                "dimension": dimension,
+                "start": start,
+                "end": end,
+                "series": rollup_series(
+                    period, dimension, start, end, int(key) if key else None
+                ),
+            }
+        )
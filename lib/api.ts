@@ -57,6 +57,13 @@ export interface Billboard {
   price: string
   notes: string
   images: any[]
+  image_sets?: {
+    src: string
+    thumbnail: string
+    srcset: string
+    srcset_webp: string
+    original: string
+  }[]
   days_until_expiry: number
   created_at: string
   updated_at: string
@@ -79,6 +86,12 @@ export interface Statistics {
   maintenance: number
   categories: { [key: string]: number }
   contractors: { [key: string]: number }
+  revenue?: {
+    total: number
+    statuses: { [key: string]: number }
+    categories: { [key: string]: number }
+    contractors: { [key: string]: number }
+  }
   billboards?: number
   bus_stops?: number
 }
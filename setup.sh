@@ -18,6 +18,9 @@ python manage.py makemigrations
 # Применение миграций
 python manage.py migrate
 
+# Заполнение геоиндекса для существующих билбордов
+python manage.py rebuild_grid_cells
+
 # Создание суперпользователя
 python manage.py createsuperuser
 